@@ -0,0 +1,31 @@
+"""Cost of encoding one process log for every open websocket subscriber."""
+from utils import bootstrap, measure
+
+bootstrap(log_level="WARNING")
+
+from nonebot_plugin_gocqhttp.process.models import (  # noqa: E402
+    ProcessLogLevel,
+    ProcessLogRecord,
+)
+
+SUBSCRIBERS = 10
+MESSAGE = "收到群 123456789 内 987654321 的消息: hello world"
+
+
+def model_json():
+    record = ProcessLogRecord(MESSAGE, ProcessLogLevel.INFO)
+    for _ in range(SUBSCRIBERS):
+        record.to_model(1).json()
+
+
+def shared_frame():
+    record = ProcessLogRecord(MESSAGE, ProcessLogLevel.INFO)
+    for _ in range(SUBSCRIBERS):
+        record.frame(1)
+
+
+if __name__ == "__main__":
+    print(f"encoding one log for {SUBSCRIBERS} subscribers")
+    before = measure("ProcessLog.json per subscriber (before)", model_json)
+    after = measure("ProcessLogRecord.frame shared (after)", shared_frame)
+    print(f"speedup: {before / after:.1f}x")
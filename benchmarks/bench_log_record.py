@@ -0,0 +1,27 @@
+"""Per-line cost of turning go-cqhttp output into a stored log entry."""
+from utils import bootstrap, measure
+
+bootstrap(log_level="WARNING")
+
+from nonebot_plugin_gocqhttp.process.models import ProcessLog  # noqa: E402
+from nonebot_plugin_gocqhttp.process.process import LOG_REGEX, GoCQProcess  # noqa: E402
+
+LINE = "[2023-05-01 12:34:56] [INFO]: 收到群 123456789 内 987654321 的消息: hello world"
+OUTPUT = f"{LINE}\n".encode()
+
+
+def parse_obj():
+    line = OUTPUT.strip().decode("utf-8", "replace")
+    log_matched = LOG_REGEX.match(line)
+    assert log_matched
+    return ProcessLog.parse_obj(log_matched.groupdict())
+
+
+parse_record = GoCQProcess.__new__(GoCQProcess)._parse_output
+record = parse_record(OUTPUT)
+
+if __name__ == "__main__":
+    before = measure("ProcessLog.parse_obj (before)", parse_obj)
+    after = measure("ProcessLogRecord (after)", lambda: parse_record(OUTPUT))
+    measure("ProcessLogRecord.to_model", record.to_model)
+    print(f"speedup: {before / after:.1f}x")
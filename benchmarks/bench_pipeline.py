@@ -0,0 +1,155 @@
+"""End-to-end benchmark of the process log pipeline."""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import psutil
+from utils import bootstrap
+
+FAKE_EXECUTABLE = Path(__file__).parent.absolute() / "fake_gocqhttp.py"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=1000, help="lines/s/process")
+    parser.add_argument("--line-length", type=int, default=120)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds")
+    parser.add_argument(
+        "--crash-after", type=int, default=0, help="lines before each crash"
+    )
+    parser.add_argument("--supervisor", choices=("thread", "asyncio"), default="thread")
+    parser.add_argument("--output", type=Path, help="also write results here")
+    return parser.parse_args()
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        **{
+            f"p{p}": values[min(len(values) * p // 100, len(values) - 1)]
+            for p in (50, 90, 99)
+        },
+        "max": values[-1],
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=Path(__file__).parent,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def measure_loop_lag(lags: List[float], interval: float = 0.01):
+    while True:
+        begin = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - begin - interval) * 1000)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from nonebot_plugin_gocqhttp.plugin_config import AccountConfig
+    from nonebot_plugin_gocqhttp.process import ProcessesManager, ProcessLogRecord
+
+    latencies: List[float] = []
+    recording = False
+
+    async def sender(seq: int, log: ProcessLogRecord):
+        log.frame(seq)
+        if recording and (written := log.message.split(" ", 1)[0]).isdigit():
+            latencies.append((time.time_ns() - int(written)) / 1e6)
+
+    processes = [
+        ProcessesManager.create_instance(AccountConfig(uin=10000 + index))
+        for index in range(args.processes)
+    ]
+    subscribers = [process.logs.subscribe(sender) for process in processes]
+    lags: List[float] = []
+    lag_task = asyncio.create_task(measure_loop_lag(lags))
+    rss = psutil.Process().memory_info().rss
+
+    await asyncio.gather(*(process.start() for process in processes))
+    await asyncio.sleep(args.warmup)
+
+    recording, lags[:] = True, []
+    rss_begin, logs_begin = psutil.Process().memory_info().rss, sum(
+        process.logs.count for process in processes
+    )
+    begin = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - begin
+    recording = False
+    logs_end = sum(process.logs.count for process in processes)
+    rss_end = psutil.Process().memory_info().rss
+    restarts = sum(process.restart_count for process in processes)
+
+    lag_task.cancel()
+    for subscriber in subscribers:
+        subscriber.close()
+    await asyncio.gather(*(process.stop() for process in processes))
+
+    return {
+        "commit": current_commit(),
+        "python": sys.version.split()[0],
+        "parameters": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "throughput_lines_per_second": (logs_end - logs_begin) / elapsed,
+        "expected_lines_per_second": args.rate * args.processes,
+        "latency_ms": percentiles(latencies),
+        "loop_lag_ms": percentiles(lags),
+        "memory_mib": {
+            "before_start": rss / 2**20,
+            "after_warmup": rss_begin / 2**20,
+            "growth": (rss_end - rss_begin) / 2**20,
+        },
+        "restarts": restarts,
+        "dropped_frames": sum(subscriber.dropped for subscriber in subscribers),
+    }
+
+
+def main():
+    args = parse_args()
+    if args.output:
+        args.output = args.output.absolute()
+    os.environ.update(
+        FAKE_GOCQ_RATE=str(args.rate),
+        FAKE_GOCQ_LINE_LENGTH=str(args.line_length),
+        FAKE_GOCQ_CRASH_AFTER=str(args.crash_after),
+    )
+    # account data is created relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="gocq-bench-"))
+    bootstrap(
+        log_level="WARNING",
+        gocq_process_executable=str(FAKE_EXECUTABLE),
+        gocq_process_supervisor=args.supervisor,
+        gocq_process_kwargs={
+            "print_process_log": False,
+            "restart_interval": 0.1,
+            "post_delay": 0,
+        },
+    )
+    results = asyncio.run(run(args))
+    print(output := json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Stand-in for the go-cqhttp binary, configured by ``FAKE_GOCQ_*`` variables."""
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import count, cycle
+
+STARTUP_FINISH_PROMPT = "アトリは、高性能ですから!"
+LEVELS = ("INFO", "INFO", "INFO", "DEBUG", "WARNING")
+TICK = 0.01
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(f"FAKE_GOCQ_{name}", default))
+
+
+def main():
+    rate, line_length = env_int("RATE", 1000), env_int("LINE_LENGTH", 120)
+    total_lines, crash_after = env_int("LINES", 0), env_int("CRASH_AFTER", 0)
+    exit_code = env_int("EXIT_CODE", 1)
+
+    out = sys.stdout.buffer
+    out.write(f"{STARTUP_FINISH_PROMPT}\n".encode())
+    out.flush()
+
+    limit = min(filter(None, (total_lines, crash_after)), default=0)
+    padding = "x" * max(line_length - 20, 0)
+    per_tick = max(int(rate * TICK), 1) if rate else 1024
+    levels, written = cycle(LEVELS), 0
+    begin = time.perf_counter()
+
+    for tick in count(1):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        burst = per_tick if not limit else min(per_tick, limit - written)
+        out.write(
+            b"".join(
+                f"[{now}] [{next(levels)}]: {time.time_ns()} {padding}\n".encode()
+                for _ in range(burst)
+            )
+        )
+        out.flush()
+        written += burst
+        if limit and written >= limit:
+            break
+        if rate and (delay := begin + tick * TICK - time.perf_counter()) > 0:
+            time.sleep(delay)
+
+    if crash_after and written >= crash_after:
+        sys.exit(exit_code)
+    for _ in sys.stdin:  # idle until stopped, like a logged-in go-cqhttp
+        pass
+
+
+if __name__ == "__main__":
+    main()
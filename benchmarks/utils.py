@@ -0,0 +1,22 @@
+import json
+import os
+import timeit
+from typing import Callable
+
+import nonebot
+from nonebot.adapters.onebot.v11 import Adapter
+
+
+def bootstrap(**config):
+    """Initialize NoneBot with the FastAPI driver and load the plugin."""
+    config = {**json.loads(os.environ.get("BENCHMARK_CONFIG", "{}")), **config}
+    nonebot.init(driver="~fastapi", **config)
+    nonebot.get_driver().register_adapter(Adapter)
+    nonebot.load_plugin("nonebot_plugin_gocqhttp")
+
+
+def measure(name: str, func: Callable[[], object], *, number: int = 100_000):
+    """Print the best per-call cost of ``func`` over five rounds."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<40} {best * 1e6:>10.3f} us/call")
+    return best
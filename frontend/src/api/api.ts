@@ -47,6 +47,12 @@ export interface AccountConfig {
      * @memberof AccountConfig
      */
     'protocol'?: AccountProtocol;
+    /**
+     * 
+     * @type {number}
+     * @memberof AccountConfig
+     */
+    'priority'?: number;
 }
 /**
  * 
@@ -79,6 +85,12 @@ export interface AccountCreation {
      * @memberof AccountCreation
      */
     'protocol'?: AccountProtocol;
+    /**
+     * 
+     * @type {number}
+     * @memberof AccountCreation
+     */
+    'priority'?: number;
 }
 /**
  * 
@@ -400,12 +412,24 @@ export interface ProcessInfo {
      * @memberof ProcessInfo
      */
     'restarts': number;
+    /**
+     * 
+     * @type {boolean}
+     * @memberof ProcessInfo
+     */
+    'crash_loop'?: boolean;
+    /**
+     * 
+     * @type {string}
+     * @memberof ProcessInfo
+     */
+    'qr_version'?: string;
     /**
      * 
      * @type {string}
      * @memberof ProcessInfo
      */
-    'qr_uri'?: string;
+    'error'?: string;
     /**
      * 
      * @type {Details}
@@ -421,6 +445,12 @@ export interface ProcessInfo {
  * @interface ProcessLog
  */
 export interface ProcessLog {
+    /**
+     * 
+     * @type {number}
+     * @memberof ProcessLog
+     */
+    'seq'?: number;
     /**
      * 
      * @type {string}
@@ -466,7 +496,8 @@ export type ProcessLogLevel = typeof ProcessLogLevel[keyof typeof ProcessLogLeve
 
 export const ProcessStatus = {
     Running: 'running',
-    Stopped: 'stopped'
+    Stopped: 'stopped',
+    Queued: 'queued'
 } as const;
 
 export type ProcessStatus = typeof ProcessStatus[keyof typeof ProcessStatus];
@@ -610,6 +641,12 @@ export interface SystemMemoryDetail {
  * @interface SystemStatus
  */
 export interface SystemStatus {
+    /**
+     * 
+     * @type {number}
+     * @memberof SystemStatus
+     */
+    'time': number;
     /**
      * 
      * @type {number}
@@ -1078,11 +1115,10 @@ export const ApiApiAxiosParamCreator = function (configuration?: Configuration)
         /**
          * 
          * @summary All Accounts
-         * @param {number} [nicknameCache] 
          * @param {*} [options] Override http request option.
          * @throws {RequiredError}
          */
-        allAccountsApiAccountsGet: async (nicknameCache?: number, options: AxiosRequestConfig = {}): Promise<RequestArgs> => {
+        allAccountsApiAccountsGet: async (options: AxiosRequestConfig = {}): Promise<RequestArgs> => {
             const localVarPath = `/api/accounts`;
             // use dummy base URL string because the URL constructor only accepts absolute URLs.
             const localVarUrlObj = new URL(localVarPath, DUMMY_BASE_URL);
@@ -1095,10 +1131,6 @@ export const ApiApiAxiosParamCreator = function (configuration?: Configuration)
             const localVarHeaderParameter = {} as any;
             const localVarQueryParameter = {} as any;
 
-            if (nicknameCache !== undefined) {
-                localVarQueryParameter['nickname_cache'] = nicknameCache;
-            }
-
 
     
             setSearchParams(localVarUrlObj, localVarQueryParameter);
@@ -1424,6 +1456,36 @@ export const ApiApiAxiosParamCreator = function (configuration?: Configuration)
 
 
     
+            setSearchParams(localVarUrlObj, localVarQueryParameter);
+            let headersFromBaseOptions = baseOptions && baseOptions.headers ? baseOptions.headers : {};
+            localVarRequestOptions.headers = {...localVarHeaderParameter, ...headersFromBaseOptions, ...options.headers};
+
+            return {
+                url: toPathString(localVarUrlObj),
+                options: localVarRequestOptions,
+            };
+        },
+        /**
+         * 
+         * @summary System Status History
+         * @param {*} [options] Override http request option.
+         * @throws {RequiredError}
+         */
+        systemStatusHistoryApiStatusHistoryGet: async (options: AxiosRequestConfig = {}): Promise<RequestArgs> => {
+            const localVarPath = `/api/status/history`;
+            // use dummy base URL string because the URL constructor only accepts absolute URLs.
+            const localVarUrlObj = new URL(localVarPath, DUMMY_BASE_URL);
+            let baseOptions;
+            if (configuration) {
+                baseOptions = configuration.baseOptions;
+            }
+
+            const localVarRequestOptions = { method: 'GET', ...baseOptions, ...options};
+            const localVarHeaderParameter = {} as any;
+            const localVarQueryParameter = {} as any;
+
+
+    
             setSearchParams(localVarUrlObj, localVarQueryParameter);
             let headersFromBaseOptions = baseOptions && baseOptions.headers ? baseOptions.headers : {};
             localVarRequestOptions.headers = {...localVarHeaderParameter, ...headersFromBaseOptions, ...options.headers};
@@ -1561,12 +1623,11 @@ export const ApiApiFp = function(configuration?: Configuration) {
         /**
          * 
          * @summary All Accounts
-         * @param {number} [nicknameCache] 
          * @param {*} [options] Override http request option.
          * @throws {RequiredError}
          */
-        async allAccountsApiAccountsGet(nicknameCache?: number, options?: AxiosRequestConfig): Promise<(axios?: AxiosInstance, basePath?: string) => AxiosPromise<Array<AccountListItem>>> {
-            const localVarAxiosArgs = await localVarAxiosParamCreator.allAccountsApiAccountsGet(nicknameCache, options);
+        async allAccountsApiAccountsGet(options?: AxiosRequestConfig): Promise<(axios?: AxiosInstance, basePath?: string) => AxiosPromise<Array<AccountListItem>>> {
+            const localVarAxiosArgs = await localVarAxiosParamCreator.allAccountsApiAccountsGet(options);
             return createRequestFunction(localVarAxiosArgs, globalAxios, BASE_PATH, configuration);
         },
         /**
@@ -1671,6 +1732,16 @@ export const ApiApiFp = function(configuration?: Configuration) {
             const localVarAxiosArgs = await localVarAxiosParamCreator.systemStatusApiStatusGet(options);
             return createRequestFunction(localVarAxiosArgs, globalAxios, BASE_PATH, configuration);
         },
+        /**
+         * 
+         * @summary System Status History
+         * @param {*} [options] Override http request option.
+         * @throws {RequiredError}
+         */
+        async systemStatusHistoryApiStatusHistoryGet(options?: AxiosRequestConfig): Promise<(axios?: AxiosInstance, basePath?: string) => AxiosPromise<Array<SystemStatus>>> {
+            const localVarAxiosArgs = await localVarAxiosParamCreator.systemStatusHistoryApiStatusHistoryGet(options);
+            return createRequestFunction(localVarAxiosArgs, globalAxios, BASE_PATH, configuration);
+        },
     }
 };
 
@@ -1789,12 +1860,11 @@ export const ApiApiFactory = function (configuration?: Configuration, basePath?:
         /**
          * 
          * @summary All Accounts
-         * @param {number} [nicknameCache] 
          * @param {*} [options] Override http request option.
          * @throws {RequiredError}
          */
-        allAccountsApiAccountsGet(nicknameCache?: number, options?: any): AxiosPromise<Array<AccountListItem>> {
-            return localVarFp.allAccountsApiAccountsGet(nicknameCache, options).then((request) => request(axios, basePath));
+        allAccountsApiAccountsGet(options?: any): AxiosPromise<Array<AccountListItem>> {
+            return localVarFp.allAccountsApiAccountsGet(options).then((request) => request(axios, basePath));
         },
         /**
          * 
@@ -1889,6 +1959,15 @@ export const ApiApiFactory = function (configuration?: Configuration, basePath?:
         systemStatusApiStatusGet(options?: any): AxiosPromise<SystemStatus> {
             return localVarFp.systemStatusApiStatusGet(options).then((request) => request(axios, basePath));
         },
+        /**
+         * 
+         * @summary System Status History
+         * @param {*} [options] Override http request option.
+         * @throws {RequiredError}
+         */
+        systemStatusHistoryApiStatusHistoryGet(options?: any): AxiosPromise<Array<SystemStatus>> {
+            return localVarFp.systemStatusHistoryApiStatusHistoryGet(options).then((request) => request(axios, basePath));
+        },
     };
 };
 
@@ -2027,13 +2106,12 @@ export class ApiApi extends BaseAPI {
     /**
      * 
      * @summary All Accounts
-     * @param {number} [nicknameCache] 
      * @param {*} [options] Override http request option.
      * @throws {RequiredError}
      * @memberof ApiApi
      */
-    public allAccountsApiAccountsGet(nicknameCache?: number, options?: AxiosRequestConfig) {
-        return ApiApiFp(this.configuration).allAccountsApiAccountsGet(nicknameCache, options).then((request) => request(this.axios, this.basePath));
+    public allAccountsApiAccountsGet(options?: AxiosRequestConfig) {
+        return ApiApiFp(this.configuration).allAccountsApiAccountsGet(options).then((request) => request(this.axios, this.basePath));
     }
 
     /**
@@ -2146,6 +2224,17 @@ export class ApiApi extends BaseAPI {
     public systemStatusApiStatusGet(options?: AxiosRequestConfig) {
         return ApiApiFp(this.configuration).systemStatusApiStatusGet(options).then((request) => request(this.axios, this.basePath));
     }
+
+    /**
+     * 
+     * @summary System Status History
+     * @param {*} [options] Override http request option.
+     * @throws {RequiredError}
+     * @memberof ApiApi
+     */
+    public systemStatusHistoryApiStatusHistoryGet(options?: AxiosRequestConfig) {
+        return ApiApiFp(this.configuration).systemStatusHistoryApiStatusHistoryGet(options).then((request) => request(this.axios, this.basePath));
+    }
 }
 
 
@@ -1,14 +1,16 @@
 import asyncio
+from typing import TYPE_CHECKING
 
 from fastapi import FastAPI
 from nonebot import get_driver
+from nonebot.adapters import Bot
 from nonebot.adapters.onebot.v11 import Adapter
 from nonebot.drivers import ReverseDriver
 from nonebot.log import default_filter, default_format
 
 import nonebot_plugin_gocqhttp.plugin  # noqa: F401
 from nonebot_plugin_gocqhttp import web
-from nonebot_plugin_gocqhttp.log import LOG_STORAGE, logger
+from nonebot_plugin_gocqhttp.log import LOG_STORAGE, LogBatcher, SystemLog, logger
 from nonebot_plugin_gocqhttp.plugin_config import config
 from nonebot_plugin_gocqhttp.process import (
     ACCOUNTS_LEGACY_SAVE_PATH,
@@ -17,6 +19,11 @@ from nonebot_plugin_gocqhttp.process import (
     ProcessesManager,
     download_gocq,
 )
+from nonebot_plugin_gocqhttp.web.bots import BOT_REGISTRY, refresh_login_info
+from nonebot_plugin_gocqhttp.web.status import STATUS_COLLECTOR
+
+if TYPE_CHECKING:
+    from loguru import Message
 
 driver = get_driver()
 
@@ -30,10 +37,10 @@ driver.server_app.mount("/go-cqhttp", web.app, name="go-cqhttp plugin")
 
 @driver.on_startup
 async def startup():
-    loop = asyncio.get_running_loop()
+    log_batcher = LogBatcher(LOG_STORAGE, asyncio.get_running_loop())
 
-    def log_sink(message: str):
-        loop.create_task(LOG_STORAGE.add(message.rstrip("\n")))
+    def log_sink(message: "Message"):
+        log_batcher.put(SystemLog(message.record["level"].name, message.rstrip("\n")))
 
     logger.add(log_sink, colorize=True, filter=default_filter, format=default_format)
 
@@ -53,10 +60,7 @@ async def startup():
         )
         await ProcessesManager.save()  # update to new format
 
-    await asyncio.gather(
-        *map(lambda process: process.start(), ProcessesManager.all()),
-        return_exceptions=True,
-    )
+    ProcessesManager.startup_task = asyncio.create_task(ProcessesManager.start_all())
 
     if tunnel_port := config.TUNNEL_PORT:
         try:
@@ -75,9 +79,39 @@ async def startup():
     )
 
 
+@driver.on_bot_connect
+async def register_bot(bot: Bot):
+    BOT_REGISTRY.add(bot)
+    if bot.self_id.isdigit():
+        refresh_login_info(int(bot.self_id))
+    notify_bot_connection(bot)
+
+
+@driver.on_bot_disconnect
+async def unregister_bot(bot: Bot):
+    BOT_REGISTRY.remove(bot)
+    notify_bot_connection(bot)
+
+
+def notify_bot_connection(bot: Bot):
+    if bot.self_id.isdigit() and (process := ProcessesManager.get(int(bot.self_id))):
+        process.notify_status()
+
+
 @driver.on_shutdown
 async def shutdown():
+    STATUS_COLLECTOR.stop()
+    if ProcessesManager.startup_task is not None:
+        ProcessesManager.startup_task.cancel()
     await asyncio.gather(
         *map(lambda process: process.stop(), ProcessesManager.all()),
         return_exceptions=True,
     )
+    await asyncio.gather(
+        *(
+            process.archive.flush()
+            for process in ProcessesManager.all()
+            if process.archive
+        ),
+        return_exceptions=True,
+    )
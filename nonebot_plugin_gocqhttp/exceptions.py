@@ -35,6 +35,11 @@ class SessionTokenNotFound(PluginGoCQException):
     code = 404
 
 
+class QRCodeNotFound(PluginGoCQException):
+    message = "File qrcode.png not found"
+    code = 404
+
+
 class AccountAlreadyExists(PluginGoCQException):
     message = "Account already exists"
     code = 409
@@ -48,3 +53,18 @@ class RemovePredefinedAccount(PluginGoCQException):
 class BadConfigFormat(PluginGoCQException):
     message = "Bad config format"
     code = 400
+
+
+class LogArchiveDisabled(PluginGoCQException):
+    message = "Log archive is not enabled for this account"
+    code = 404
+
+
+class BadLogQuery(PluginGoCQException):
+    message = "Bad log query"
+    code = 400
+
+
+class ProfilingDisabled(PluginGoCQException):
+    message = "Stage profiling is not enabled for this account"
+    code = 404
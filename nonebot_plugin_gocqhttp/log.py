@@ -1,7 +1,30 @@
 import asyncio
+import heapq
 import logging
 import re
-from typing import Awaitable, Callable, ClassVar, Dict, Generic, List, Set, TypeVar
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import islice, repeat
+from operator import attrgetter
+from typing import (
+    Awaitable,
+    Callable,
+    ClassVar,
+    Collection,
+    Deque,
+    Dict,
+    Generic,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 from urllib.parse import urlparse
 
 from nonebot.log import logger as _logger
@@ -9,31 +32,318 @@ from nonebot.log import logger as _logger
 from .plugin_config import config as plugin_config
 
 _T = TypeVar("_T")
-LogListener = Callable[[_T], Awaitable[None]]
+LogListener = Callable[[Sequence[_T]], Awaitable[None]]
+LogSender = Callable[[int, _T], Awaitable[None]]
+OverflowPolicy = Literal["drop_oldest", "disconnect"]
+StageTimer = Callable[[str, int], None]
+
+
+class LogGap(NamedTuple):
+    """Logs after ``since`` were requested, but only those from ``resumed`` remain."""
+
+    since: int
+    resumed: int
+
+    @property
+    def missed(self) -> int:
+        return self.resumed - self.since - 1
+
+
+GapSender = Callable[[LogGap], Awaitable[None]]
+
+
+class LogSubscriber(Generic[_T]):
+    """Deliver logs to a single consumer through its own bounded queue."""
+
+    def __init__(
+        self,
+        storage: "LogStorage[_T]",
+        sender: LogSender[_T],
+        *,
+        max_pending: int = 1024,
+        overflow: OverflowPolicy = "drop_oldest",
+        replay: Sequence[Tuple[int, _T]] = (),
+        gap: Optional[LogGap] = None,
+        gap_sender: Optional[GapSender] = None,
+    ):
+        self.storage, self.sender = storage, sender
+        self.max_pending, self.overflow = max_pending, overflow
+        self.replay, self.gap, self.gap_sender = replay, gap, gap_sender
+        self.pending: Deque[Tuple[int, _T]] = deque()
+        self.delivered, self.dropped, self.lagged = 0, 0, False
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._deliver())
+
+    async def _deliver(self):
+        if self.gap is not None and self.gap_sender is not None:
+            await self.gap_sender(self.gap)
+        replay, self.replay = self.replay, ()
+        for seq, log in replay:
+            await self.sender(seq, log)
+            self.delivered += 1
+        while True:
+            while self.pending:
+                await self.sender(*self.pending.popleft())
+                self.delivered += 1
+            await self.wakeup.wait()
+            self.wakeup.clear()
+
+    def _drop(self, count: int):
+        self.dropped += count
+        self.storage.dropped += count
+
+    def put_many(self, logs: Sequence[Tuple[int, _T]]):
+        if self.lagged:
+            return
+        overflowed = len(self.pending) + len(logs) - self.max_pending
+        if overflowed > 0 and self.overflow == "disconnect":
+            self._drop(len(self.pending) + len(logs))
+            self.pending.clear()
+            self.lagged = True
+            self.task.cancel()
+            return
+        elif overflowed > 0:
+            self._drop(overflowed)
+            for _ in range(min(overflowed, len(self.pending))):
+                self.pending.popleft()
+            logs = logs[-self.max_pending :]
+        self.pending.extend(logs)
+        self.wakeup.set()
+
+    def close(self):
+        self.storage.subscribers.discard(self)
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled():
+            self.task.exception()  # mark as retrieved, the consumer is gone anyway
 
 
 class LogStorage(Generic[_T]):
-    def __init__(self, rotation: float = 5 * 60):
-        self.count, self.rotation = 0, rotation
-        self.logs: Dict[int, _T] = {}
+    """Ring buffer of logs, capped by both entry count and entry age."""
+
+    def __init__(
+        self,
+        rotation: float = 5 * 60,
+        max_size: int = 10000,
+        level_of: Optional[Callable[[_T], str]] = None,
+    ):
+        self.count, self.rotation, self.max_size = 0, rotation, max_size
+        self.times: Deque[float] = deque(maxlen=max_size)
+        self.logs: Deque[_T] = deque(maxlen=max_size)
+        self.level_of = level_of
+        self.level_index: Dict[str, Deque[int]] = {}
+        self.level_counts: Dict[str, int] = {}
+        self.dropped = 0
+        self.stage_timer: Optional[StageTimer] = None
         self.listeners: Set[LogListener[_T]] = set()
+        self.subscribers: Set[LogSubscriber[_T]] = set()
+
+    def __len__(self):
+        return len(self.logs)
+
+    @property
+    def first_seq(self) -> int:
+        return self.count - len(self.logs) + 1
+
+    def evict(self, now: Optional[float] = None) -> int:
+        expire_before = (now or time.time()) - self.rotation
+        if not self.times or self.times[0] >= expire_before:
+            return 0
+        expired = bisect_left(self.times, expire_before)
+        for _ in range(expired):
+            self.times.popleft()
+            self.logs.popleft()
+        return expired
 
     async def add(self, log: _T):
-        seq = self.count = self.count + 1
-        self.logs[seq] = log
-        asyncio.get_running_loop().call_later(self.rotation, self.remove, seq)
-        await asyncio.gather(
-            *map(lambda listener: listener(log), self.listeners),
-            return_exceptions=True,
-        )
+        return await self.add_many((log,))
+
+    async def add_many(self, logs: Sequence[_T]):
+        if (stage_timer := self.stage_timer) is not None:
+            begin = time.perf_counter_ns()
+        now = time.time()
+        self.evict(now)
+        self.times.extend(repeat(now, len(logs)))
+        self.logs.extend(logs)
+        seq = self.count = self.count + len(logs)
+
+        if self.level_of is not None:
+            for log_seq, log in zip(range(seq - len(logs) + 1, seq + 1), logs):
+                if (index := self.level_index.get(level := self.level_of(log))) is None:
+                    index = self.level_index[level] = deque(maxlen=self.max_size)
+                index.append(log_seq)
+                self.level_counts[level] = self.level_counts.get(level, 0) + 1
+
+        if self.subscribers:
+            items = [*zip(range(seq - len(logs) + 1, seq + 1), logs)]
+            for subscriber in self.subscribers:
+                subscriber.put_many(items)
+
+        if stage_timer is not None:
+            inserted = time.perf_counter_ns()
+            stage_timer("insert", inserted - begin)
+
+        async def notify(listener: LogListener[_T]):
+            try:
+                await listener(logs)
+            except Exception:
+                pass
+
+        await asyncio.gather(*map(notify, self.listeners))
+        if stage_timer is not None:
+            stage_timer("fanout", time.perf_counter_ns() - inserted)
         return seq
 
-    def remove(self, seq: int):
-        del self.logs[seq]
-        return
+    def subscribe(
+        self,
+        sender: LogSender[_T],
+        *,
+        max_pending: int = 1024,
+        overflow: OverflowPolicy = "drop_oldest",
+        since: Optional[int] = None,
+        gap_sender: Optional[GapSender] = None,
+    ) -> LogSubscriber[_T]:
+        """Subscribe to new logs, replaying the buffered ones after ``since`` first."""
+        replay, gap = (), None
+        if since is not None:
+            replay = self.items(after_seq=since)
+            if since < self.count and since + 1 < self.first_seq:
+                gap = LogGap(since, self.first_seq)
+        subscriber = LogSubscriber(
+            self,
+            sender,
+            max_pending=max_pending,
+            overflow=overflow,
+            replay=replay,
+            gap=gap,
+            gap_sender=gap_sender,
+        )
+        self.subscribers.add(subscriber)
+        return subscriber
 
     def list(self, reverse: bool = False) -> List[_T]:
-        return [self.logs[seq] for seq in sorted(self.logs, reverse=reverse)]
+        self.evict()
+        return [*reversed(self.logs)] if reverse else [*self.logs]
+
+    def items(
+        self,
+        after_seq: Optional[int] = None,
+        before_seq: Optional[int] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[Tuple[int, _T]]:
+        """Return ``(seq, log)`` pairs with ``after_seq < seq < before_seq``."""
+        return self.query(
+            after_seq=after_seq, before_seq=before_seq, limit=limit, reverse=reverse
+        )
+
+    def _indexed_seqs(self, level: str, lo: int, hi: int, reverse: bool):
+        seqs = self.level_index.get(level)
+        if not seqs:
+            return iter(())
+        while seqs and seqs[0] < self.first_seq:
+            seqs.popleft()
+        start, stop = bisect_left(seqs, lo), bisect_left(seqs, hi)
+        return (
+            islice(reversed(seqs), len(seqs) - stop, len(seqs) - start)
+            if reverse
+            else islice(seqs, start, stop)
+        )
+
+    def query(
+        self,
+        *,
+        levels: Optional[Collection[str]] = None,
+        predicate: Optional[Callable[[_T], bool]] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        after_seq: Optional[int] = None,
+        before_seq: Optional[int] = None,
+        limit: Optional[int] = None,
+        reverse: bool = False,
+    ) -> List[Tuple[int, _T]]:
+        """Like `items`, but only return logs matching every given filter."""
+        if levels is not None and self.level_of is None:
+            raise ValueError("Logs in this storage are not indexed by level")
+
+        self.evict()
+        first_seq, size = self.first_seq, len(self.logs)
+        start = 0 if after_seq is None else max(after_seq - first_seq + 1, 0)
+        stop = size if before_seq is None else min(max(before_seq - first_seq, 0), size)
+        if start_time is not None:
+            start = max(start, bisect_left(self.times, start_time))
+        if end_time is not None:
+            stop = min(stop, bisect_right(self.times, end_time))
+        if start >= stop:
+            return []
+
+        if levels is not None:
+            seqs = heapq.merge(
+                *(
+                    self._indexed_seqs(
+                        level, first_seq + start, first_seq + stop, reverse
+                    )
+                    for level in levels
+                ),
+                reverse=reverse,
+            )
+            candidates = ((seq, self.logs[seq - first_seq]) for seq in seqs)
+        elif reverse:
+            candidates = zip(
+                range(first_seq + stop - 1, first_seq + start - 1, -1),
+                islice(reversed(self.logs), size - stop, size - start),
+            )
+        else:
+            candidates = zip(
+                range(first_seq + start, first_seq + stop),
+                islice(self.logs, start, stop),
+            )
+
+        if predicate is not None:
+            candidates = (item for item in candidates if predicate(item[1]))
+        return [*islice(candidates, limit)]
+
+
+class LogBatcher(Generic[_T]):
+    """Hand logs produced on another thread over to a `LogStorage` in batches."""
+
+    def __init__(
+        self,
+        storage: LogStorage[_T],
+        loop: asyncio.AbstractEventLoop,
+        *,
+        max_size: int = 256,
+        max_delay: float = 0.05,
+    ):
+        self.storage, self.loop = storage, loop
+        self.max_size, self.max_delay = max_size, max_delay
+        self.pending: List[_T] = []
+        self.pending_since = 0
+        self.lock = threading.Lock()
+
+    def put(self, log: _T):
+        with self.lock:
+            self.pending.append(log)
+            size = len(self.pending)
+        if size == 1:
+            if self.storage.stage_timer is not None:
+                self.pending_since = time.perf_counter_ns()
+            self.loop.call_soon_threadsafe(
+                self.loop.call_later, self.max_delay, self.flush
+            )
+        elif size == self.max_size:
+            self.loop.call_soon_threadsafe(self.flush)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch and (stage_timer := self.storage.stage_timer) is not None:
+            stage_timer("handoff", time.perf_counter_ns() - self.pending_since)
+        if batch:
+            self.loop.create_task(self.storage.add_many(batch))
+
+    def flush_threadsafe(self):
+        self.loop.call_soon_threadsafe(self.flush)
 
 
 class AccessLogFilter(logging.Filter):
@@ -62,6 +372,12 @@ logging.getLogger("uvicorn.access").addFilter(AccessLogFilter())
 STDOUT = _logger.level("STDOUT", no=logging.INFO)
 FATAL = _logger.level("FATAL", no=logging.FATAL)
 
-LOG_STORAGE = LogStorage[str]()
+
+class SystemLog(NamedTuple):
+    level: str
+    text: str
+
+
+LOG_STORAGE = LogStorage[SystemLog](level_of=attrgetter("level"))
 
 logger = _logger.opt(colors=True)
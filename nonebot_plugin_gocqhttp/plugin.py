@@ -30,13 +30,9 @@ STOPPED_MESSAGE_TEMPLATE = MessageTemplate(
 @handler.handle()
 async def _(bot: Bot, event: MessageEvent):
     messages = Message()
-    for process in ProcessesManager.all():
-        try:
-            status = await process.status()
-        except RuntimeError:
-            continue
+    for uin, status in ProcessesManager.status_all().items():
         messages += STATUS_MESSAGE_TEMPLATE.format(
-            account=process.account.uin,
+            account=uin,
             total_logs=status.total_logs,
             restarts=status.restarts,
         )
@@ -22,6 +22,7 @@ class AccountConfig(BaseModel):
     uin: int
     password: Optional[str] = None
     protocol: AccountProtocol = AccountProtocol.Default
+    priority: int = 0
 
 
 class PluginConfig(BaseModel):
@@ -45,6 +46,7 @@ class PluginConfig(BaseModel):
     DOWNLOAD_VERSION: Optional[str] = Field(None, alias="gocq_version")
     DOWNLOAD_URL: Optional[HttpUrl] = Field(None, alias="gocq_url")
     FORCE_DOWNLOAD: bool = Field(False, alias="gocq_force_download")
+    DOWNLOAD_SEGMENTS: int = Field(4, alias="gocq_download_segments", gt=0)
 
     PROCESS_KWARGS: Dict[str, Any] = Field(
         default_factory=dict, alias="gocq_process_kwargs"
@@ -52,6 +54,27 @@ class PluginConfig(BaseModel):
     PROCESS_EXECUTABLE: Optional[Union[Literal["@PATH"], FilePath]] = Field(
         None, alias="gocq_process_executable"
     )
+    PROCESS_SUPERVISOR: Literal["thread", "asyncio"] = Field(
+        "thread", alias="gocq_process_supervisor"
+    )
+    STARTUP_CONCURRENCY: int = Field(4, alias="gocq_startup_concurrency", gt=0)
+    STARTUP_RATE: float = Field(2, alias="gocq_startup_rate", ge=0)
+    RESTART_BUDGET_RATE: float = Field(0.5, alias="gocq_restart_budget_rate", ge=0)
+    RESTART_BUDGET_BURST: int = Field(10, alias="gocq_restart_budget_burst", gt=0)
+
+    API_CONCURRENCY: int = Field(8, alias="gocq_api_concurrency", gt=0)
+    API_CACHE_ACTIONS: List[str] = Field(
+        [
+            "get_login_info",
+            "get_status",
+            "get_version_info",
+            "get_friend_list",
+            "get_group_list",
+        ],
+        alias="gocq_api_cache_actions",
+    )
+    API_CACHE_TTL: float = Field(10, alias="gocq_api_cache_ttl", ge=0)
+    API_CACHE_SIZE: int = Field(1024, alias="gocq_api_cache_size", gt=0)
 
     WEBUI_USERNAME: Optional[str] = Field(None, alias="gocq_webui_username")
     WEBUI_PASSWORD: Optional[str] = Field(None, alias="gocq_webui_password")
@@ -62,6 +85,11 @@ class PluginConfig(BaseModel):
 
     MUTE_ACCESS_LOG: bool = Field(True, alias="gocq_mute_access_log")
 
+    WEBSOCKET_QUEUE_SIZE: int = Field(1024, alias="gocq_websocket_queue_size", gt=0)
+    WEBSOCKET_OVERFLOW: Literal["drop_oldest", "disconnect"] = Field(
+        "drop_oldest", alias="gocq_websocket_overflow"
+    )
+
 
 driver_config = driver.config
 onebot_config = OnebotConfig.parse_obj(driver_config.dict())
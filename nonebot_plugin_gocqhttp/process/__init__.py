@@ -5,8 +5,11 @@ from .models import (
     ProcessInfo,
     ProcessLog,
     ProcessLogLevel,
+    ProcessLogRecord,
+    ProcessMetrics,
     ProcessStatus,
     RunningProcessDetail,
+    StageHistogram,
     StoppedProcessDetail,
 )
-from .process import GoCQProcess
+from .process import AsyncGoCQProcess, GoCQProcess
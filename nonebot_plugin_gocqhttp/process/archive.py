@@ -0,0 +1,342 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from nonebot.utils import run_sync
+
+from ..log import logger
+from .models import ProcessLog, ProcessLogRecord
+
+LOG_SUFFIX, SEALED_SUFFIX, INDEX_SUFFIX = ".log", ".log.gz", ".idx"
+
+
+class IndexEntry(NamedTuple):
+    offset: int
+    min_time: float
+    max_time: float
+
+
+class ActiveSegment:
+    """Segment currently being appended to, in plain NDJSON."""
+
+    def __init__(self, base: Path, block_size: int):
+        self.base, self.block_size = base, block_size
+        self.file = open(f"{base}{LOG_SUFFIX}", "ab")
+        self.index_file = open(f"{base}{INDEX_SUFFIX}", "a", encoding="utf-8")
+        self.size = self.file.tell()
+        self.index: List[IndexEntry] = []
+        self.block: Optional[IndexEntry] = None
+
+    def track(self, length: int, timestamp: float):
+        if self.block is None:
+            self.block = IndexEntry(self.size, timestamp, timestamp)
+        else:
+            self.block = self.block._replace(
+                min_time=min(self.block.min_time, timestamp),
+                max_time=max(self.block.max_time, timestamp),
+            )
+        self.size += length
+        if self.size - self.block.offset >= self.block_size:
+            self.close_block()
+
+    def write(self, line: bytes, timestamp: float):
+        self.track(self.file.write(line), timestamp)
+
+    def close_block(self):
+        if self.block is None:
+            return
+        self.index.append(self.block)
+        self.index_file.write("%d %f %f\n" % self.block)
+        self.block = None
+
+    def entries(self) -> List[IndexEntry]:
+        return [*self.index, self.block] if self.block else self.index
+
+    def flush(self):
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.close_block()
+        self.file.close()
+        self.index_file.close()
+
+
+class LogArchive:
+    """Append-only archive of the logs of one account, in NDJSON segments."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        segment_size: int = 16 * 2**20,
+        block_size: int = 64 * 2**10,
+        max_segments: int = 64,
+        flush_interval: float = 1,
+    ):
+        self.path = path
+        self.segment_size, self.block_size = segment_size, block_size
+        self.max_segments, self.flush_interval = max_segments, flush_interval
+
+        self.pending: List[ProcessLogRecord] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.flush_lock = asyncio.Lock()
+
+        self.lock = threading.Lock()
+        self.active: Optional[ActiveSegment] = None
+        self.sealed: Dict[Path, List[IndexEntry]] = {}
+        self.last_id = 0
+        self.recovered = False
+
+    @staticmethod
+    def _read_index(base: Path) -> List[IndexEntry]:
+        with open(f"{base}{INDEX_SUFFIX}", "rt", encoding="utf-8") as f:
+            return [
+                IndexEntry(int(offset), float(min_time), float(max_time))
+                for offset, min_time, max_time in map(str.split, f)
+            ]
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[ProcessLog]:
+        try:
+            return ProcessLog.parse_raw(line)
+        except ValueError:
+            return None
+
+    def _rebuild_sealed_index(self, base: Path) -> List[IndexEntry]:
+        """Rebuild the index of a sealed segment from its gzip members."""
+        entries: List[IndexEntry] = []
+        data = Path(f"{base}{SEALED_SUFFIX}").read_bytes()
+        offset = 0
+        while offset < len(data):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            block = decompressor.decompress(data[offset:])
+            if not decompressor.eof:
+                break  # truncated last member
+            timestamps = [
+                log.time.timestamp()
+                for log in map(self._parse_line, block.splitlines())
+                if log is not None
+            ]
+            if timestamps:
+                entries.append(IndexEntry(offset, min(timestamps), max(timestamps)))
+            offset = len(data) - len(decompressor.unused_data)
+        with open(f"{base}{INDEX_SUFFIX}.tmp", "wt", encoding="utf-8") as f:
+            f.writelines("%d %f %f\n" % entry for entry in entries)
+        os.replace(f"{base}{INDEX_SUFFIX}.tmp", f"{base}{INDEX_SUFFIX}")
+        return entries
+
+    def _recover_sealed(self, base: Path):
+        try:
+            self.sealed[base] = self._read_index(base)
+            return
+        except (OSError, ValueError):
+            logger.warning(f"Rebuilding broken log archive index of <e>{base}</e>")
+        try:
+            self.sealed[base] = self._rebuild_sealed_index(base)
+        except (OSError, zlib.error):
+            logger.exception(f"Dropping unreadable log archive segment <e>{base}</e>:")
+            Path(f"{base}{SEALED_SUFFIX}").unlink(missing_ok=True)
+            Path(f"{base}{INDEX_SUFFIX}").unlink(missing_ok=True)
+
+    def _recover_unsealed(self, log_path: Path):
+        base = log_path.with_suffix("")
+        Path(f"{base}{INDEX_SUFFIX}").unlink(missing_ok=True)
+        with log_path.open("rb") as f:
+            lines = f.read().splitlines(keepends=True)
+        valid = [
+            (line, log.time.timestamp())
+            for line in lines
+            if (log := self._parse_line(line)) is not None
+        ]
+        if len(valid) != len(lines):
+            # usually the last line, half-written when the previous run died
+            logger.warning(
+                f"Discarding {len(lines) - len(valid)} broken line(s) "
+                f"of log archive segment <e>{log_path}</e>"
+            )
+        if not valid:
+            log_path.unlink()
+            return
+        if len(valid) != len(lines) or not lines[-1].endswith(b"\n"):
+            valid = [
+                (line if line.endswith(b"\n") else line + b"\n", timestamp)
+                for line, timestamp in valid
+            ]
+            with open(f"{log_path}.tmp", "wb") as f:
+                f.writelines(line for line, _ in valid)
+            os.replace(f"{log_path}.tmp", log_path)
+
+        segment = ActiveSegment(base, self.block_size)
+        segment.size = 0
+        for line, timestamp in valid:
+            segment.track(len(line), timestamp)
+        self._seal(segment)
+
+    def _recover(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        for path in self.path.iterdir():
+            if (segment_id := path.name.split(".", 1)[0]).isdigit():
+                self.last_id = max(self.last_id, int(segment_id))
+
+        for sealed_path in self.path.glob(f"*{SEALED_SUFFIX}"):
+            base = sealed_path.parent / sealed_path.name[: -len(SEALED_SUFFIX)]
+            if not Path(f"{base}{LOG_SUFFIX}").exists():
+                self._recover_sealed(base)
+
+        # segments left unsealed by a previous run have their index rebuilt
+        for log_path in self.path.glob(f"*{LOG_SUFFIX}"):
+            self._recover_unsealed(log_path)
+        self.recovered = True
+
+    def _next_base(self) -> Path:
+        """Name a new segment after the creation time, unique and increasing."""
+        segment_id = max(int(time.time() * 1000), self.last_id + 1)
+        while any(
+            Path(f"{self.path / f'{segment_id:013d}'}{suffix}").exists()
+            for suffix in (LOG_SUFFIX, SEALED_SUFFIX, INDEX_SUFFIX)
+        ):
+            segment_id += 1
+        self.last_id = segment_id
+        return self.path / f"{segment_id:013d}"
+
+    def _seal(self, segment: ActiveSegment):
+        segment.close()
+        entries, sealed_entries = segment.entries(), []
+        log_path = Path(f"{segment.base}{LOG_SUFFIX}")
+        sealed_path = Path(f"{segment.base}{SEALED_SUFFIX}")
+        index_path = Path(f"{segment.base}{INDEX_SUFFIX}")
+
+        with log_path.open("rb") as source, open(f"{sealed_path}.tmp", "wb") as sink:
+            for entry, next_entry in zip(entries, [*entries[1:], None]):
+                source.seek(entry.offset)
+                block = source.read(
+                    next_entry.offset - entry.offset if next_entry else -1
+                )
+                sealed_entries.append(entry._replace(offset=sink.tell()))
+                sink.write(gzip.compress(block))
+        with open(f"{index_path}.tmp", "wt", encoding="utf-8") as f:
+            f.writelines("%d %f %f\n" % entry for entry in sealed_entries)
+
+        os.replace(f"{sealed_path}.tmp", sealed_path)
+        os.replace(f"{index_path}.tmp", index_path)
+        log_path.unlink()
+        self.sealed[segment.base] = sealed_entries
+
+        expired = len(self.sealed) - self.max_segments
+        for base in sorted(self.sealed)[: max(expired, 0)]:
+            del self.sealed[base]
+            Path(f"{base}{SEALED_SUFFIX}").unlink(missing_ok=True)
+            Path(f"{base}{INDEX_SUFFIX}").unlink(missing_ok=True)
+
+    def _write(self, records: List[ProcessLogRecord]):
+        with self.lock:
+            if not self.recovered:
+                self._recover()
+            for record in records:
+                timestamp = record.time.timestamp()
+                if self.active is None:
+                    self.active = ActiveSegment(self._next_base(), self.block_size)
+                line = json.dumps(
+                    {
+                        "time": record.time.isoformat(),
+                        "level": record.level.value,
+                        "message": record.message,
+                    },
+                    ensure_ascii=False,
+                )
+                self.active.write(f"{line}\n".encode(), timestamp)
+                if self.active.size >= self.segment_size:
+                    self._seal(self.active)
+                    self.active = None
+            if self.active is not None:
+                self.active.flush()
+
+    def _read_blocks(
+        self,
+        base: Path,
+        entries: List[IndexEntry],
+        start: Optional[float],
+        end: Optional[float],
+    ):
+        sealed = base in self.sealed
+        with open(f"{base}{SEALED_SUFFIX if sealed else LOG_SUFFIX}", "rb") as f:
+            for entry, next_entry in zip(entries, [*entries[1:], None]):
+                if start is not None and entry.max_time < start:
+                    continue
+                if end is not None and entry.min_time > end:
+                    return
+                f.seek(entry.offset)
+                block = f.read(next_entry.offset - entry.offset if next_entry else -1)
+                yield gzip.decompress(block) if sealed else block
+
+    def _query(
+        self, start: Optional[float], end: Optional[float], limit: int
+    ) -> List[ProcessLog]:
+        logs: List[ProcessLog] = []
+        with self.lock:
+            if not self.recovered:
+                self._recover()
+            segments = {**self.sealed}
+            if self.active is not None:
+                segments[self.active.base] = self.active.entries()
+
+            for base in sorted(segments):
+                if not (entries := segments[base]):
+                    continue
+                if start is not None and max(e.max_time for e in entries) < start:
+                    continue
+                if end is not None and entries[0].min_time > end:
+                    break
+                for block in self._read_blocks(base, entries, start, end):
+                    for line in block.splitlines():
+                        log = ProcessLog.parse_raw(line)
+                        timestamp = log.time.timestamp()
+                        if start is not None and timestamp < start:
+                            continue
+                        if end is not None and timestamp > end:
+                            continue
+                        logs.append(log)
+                        if len(logs) >= limit:
+                            return logs
+        return logs
+
+    def put_many(self, records: Sequence[ProcessLogRecord]):
+        self.pending.extend(records)
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, lambda: asyncio.ensure_future(self.flush())
+            )
+
+    async def flush(self):
+        async with self.flush_lock:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+                self.flush_handle = None
+            records, self.pending = self.pending, []
+            if not records:
+                return
+            try:
+                await run_sync(self._write)(records)
+            except Exception:
+                logger.exception(f"Failed to archive logs to <e>{self.path}</e>:")
+
+    async def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 1000,
+    ) -> List[ProcessLog]:
+        await self.flush()
+        return await run_sync(self._query)(
+            start.timestamp() if start else None,
+            end.timestamp() if end else None,
+            limit,
+        )
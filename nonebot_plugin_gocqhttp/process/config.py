@@ -1,5 +1,7 @@
 import json
+import mimetypes
 from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
 
 import chevron
 
@@ -123,3 +125,73 @@ class SessionTokenHelper:
 
     def delete(self):
         return self.session_path.unlink()
+
+
+class QRCodeImage(NamedTuple):
+    version: str
+    mimetype: str
+    content: bytes
+
+
+class QRCodeHelper:
+    QRCODE_FILE_NAME = "qrcode.png"
+
+    def __init__(self, account: AccountConfig):
+        self.account = account
+        self.account_path = ACCOUNTS_DATA_PATH / str(account.uin)
+        self.account_path.mkdir(parents=True, exist_ok=True)
+
+        self.qrcode_path = self.account_path / self.QRCODE_FILE_NAME
+        self.cache_key: Optional[Tuple[int, int]] = None
+        self.cached: Optional[QRCodeImage] = None
+
+    def read(self) -> Optional[QRCodeImage]:
+        """Read the QR code image, only touching its content when it changed."""
+        try:
+            stat = self.qrcode_path.stat()
+        except FileNotFoundError:
+            self.cache_key = self.cached = None
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self.cache_key or self.cached is None:
+            mimetype, _ = mimetypes.guess_type(self.qrcode_path)
+            self.cached = QRCodeImage(
+                version="%x-%x" % key,
+                mimetype=mimetype or "application/octet-stream",
+                content=self.qrcode_path.read_bytes(),
+            )
+            self.cache_key = key
+        return self.cached
+
+    @property
+    def version(self) -> Optional[str]:
+        return image.version if (image := self.read()) else None
+
+
+class PidFileHelper:
+    """Pid and creation time of the running go-cqhttp, emptied on a clean exit."""
+
+    PID_FILE_NAME = "go-cqhttp.pid"
+
+    def __init__(self, account: AccountConfig):
+        self.account = account
+        self.account_path = ACCOUNTS_DATA_PATH / str(account.uin)
+        self.account_path.mkdir(parents=True, exist_ok=True)
+
+        self.pid_path = self.account_path / self.PID_FILE_NAME
+
+    @property
+    def exists(self):
+        return self.pid_path.is_file()
+
+    def read(self) -> Optional[Tuple[int, float]]:
+        if not (content := self.pid_path.read_text().split()):
+            return None
+        pid, create_time = content
+        return int(pid), float(create_time)
+
+    def write(self, pid: int, create_time: float):
+        self.pid_path.write_text(f"{pid} {create_time!r}")
+
+    def clear(self):
+        self.pid_path.write_text("")
@@ -5,10 +5,10 @@ import time
 from base64 import b64decode
 from pathlib import Path
 from tempfile import mktemp
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from anyio import open_file
-from httpx import AsyncClient
+from httpx import AsyncClient, HTTPError
 from nonebot.utils import run_sync
 
 from nonebot_plugin_gocqhttp.log import logger
@@ -24,6 +24,17 @@ ACCOUNTS_DATA_PATH = Path(".") / "accounts"
 BINARY_DIR = ACCOUNTS_DATA_PATH / "binary"
 BINARY_PATH = BINARY_DIR / f"go-cqhttp{EXECUTABLE_EXT}"
 
+DOWNLOAD_SEGMENT_MIN_SIZE = 2**20
+
+
+class DownloadStats:
+    """Timings of the latest binary download, exported as metrics."""
+
+    probe_seconds: Dict[str, float] = {}
+    download_seconds: Optional[float] = None
+    download_bytes: int = 0
+    failures: int = 0
+
 
 @run_sync
 def unarchive_file(path: Path):
@@ -57,6 +68,7 @@ async def get_fastest_mirror(client: AsyncClient) -> List[str]:
         response.raise_for_status()
 
         elapsed_time = (time.time() - begin_time) * 1000
+        DownloadStats.probe_seconds[domain] = elapsed_time / 1000
         content_length = int(response.headers["content-length"])
         content_md5 = b64decode(response.headers["content-md5"]).hex().casefold()
 
@@ -79,10 +91,127 @@ async def get_fastest_mirror(client: AsyncClient) -> List[str]:
     return [result["url"] for result in results]
 
 
-async def download_and_extract_binary(client: AsyncClient, url: str):
-    async with await open_file(
-        download_path := Path(mktemp(suffix=ARCHIVE_EXT)), "wb"
-    ) as file, client.stream("GET", url) as response:
+class RangeNotSupported(RuntimeError):
+    pass
+
+
+async def probe_download(client: AsyncClient, url: str) -> Tuple[int, str, bool]:
+    response = await client.head(url, timeout=6)
+    response.raise_for_status()
+    return (
+        int(response.headers["Content-Length"]),
+        b64decode(response.headers["Content-MD5"]).hex().casefold(),
+        response.headers.get("Accept-Ranges", "").casefold() == "bytes",
+    )
+
+
+@run_sync
+def file_md5(path: Path) -> str:
+    hasher = hashlib.md5()
+    with path.open("rb") as f:
+        while chunk := f.read(2**20):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def download_range(
+    client: AsyncClient, urls: List[str], path: Path, start: int, end: int
+):
+    """Download bytes ``[start, end)`` into ``path``, trying each mirror in turn."""
+    for index, url in enumerate(urls):
+        try:
+            async with await open_file(path, "r+b") as file, client.stream(
+                "GET", url, headers={"Range": f"bytes={start}-{end - 1}"}
+            ) as response:
+                response.raise_for_status()
+                content_range = response.headers.get("Content-Range", "")
+                if response.status_code != 206 or not content_range.startswith(
+                    f"bytes {start}-{end - 1}/"
+                ):
+                    raise RangeNotSupported(f"Range request ignored by {url}")
+
+                await file.seek(start)
+                transfer_size = 0
+                async for chunk in response.aiter_bytes():
+                    if (transfer_size := transfer_size + len(chunk)) > end - start:
+                        raise RuntimeError(f"Range overflow from {url}")
+                    await file.write(chunk)
+            if transfer_size != end - start:
+                raise RuntimeError(
+                    f"Transferred range size mismatch: {transfer_size}/{end - start}"
+                )
+            return
+        except Exception as e:
+            if index == len(urls) - 1:
+                raise
+            logger.opt(exception=e).debug(
+                f"Failed to download range {start}-{end - 1} from <u>{url}</u>, "
+                "trying next mirror:"
+            )
+
+
+async def download_segmented(client: AsyncClient, urls: List[str], path: Path) -> int:
+    """Download ``urls[0]`` in ranges, spread over the mirrors serving it too."""
+    try:
+        total_size, content_md5, accept_ranges = await probe_download(client, urls[0])
+    except (HTTPError, KeyError, ValueError) as e:
+        raise RangeNotSupported(f"Failed to probe {urls[0]}: {e!r}") from e
+    segments = min(config.DOWNLOAD_SEGMENTS, total_size // DOWNLOAD_SEGMENT_MIN_SIZE)
+    if not accept_ranges:
+        raise RangeNotSupported(f"Range requests not supported by {urls[0]}")
+    elif segments <= 1:
+        raise RangeNotSupported("Segmented download not needed")
+
+    probes = await asyncio.gather(
+        *(probe_download(client, url) for url in urls[1:segments]),
+        return_exceptions=True,
+    )
+    urls = [
+        urls[0],
+        *(
+            url
+            for url, result in zip(urls[1:], probes)
+            if result == (total_size, content_md5, True)
+        ),
+    ]
+
+    with path.open("wb") as f:
+        f.truncate(total_size)
+    bounds = [total_size * index // segments for index in range(segments + 1)]
+    tasks = [
+        asyncio.ensure_future(
+            download_range(
+                client,
+                urls[index % len(urls) :] + urls[: index % len(urls)],
+                path,
+                start,
+                end,
+            )
+        )
+        for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+    logger.debug(
+        f"Downloading {total_size} bytes in {segments} segments "
+        f"from {len(urls)} mirror(s)"
+    )
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if (file_size := path.stat().st_size) != total_size:
+        raise RuntimeError(f"Downloaded size mismatch: {file_size}/{total_size}")
+    elif (actual_md5 := await file_md5(path)) != content_md5:
+        raise RuntimeError(f"Downloaded md5 mismatch: {actual_md5=} {content_md5=}")
+    return total_size
+
+
+async def download_single(client: AsyncClient, url: str, path: Path) -> int:
+    async with await open_file(path, "wb") as file, client.stream(
+        "GET", url
+    ) as response:
         response.raise_for_status()
 
         total_size, transfer_size = int(response.headers["Content-Length"]), 0
@@ -99,10 +228,26 @@ async def download_and_extract_binary(client: AsyncClient, url: str):
 
     if transfer_size != total_size:
         raise RuntimeError(f"Transferred size mismatch: {transfer_size}/{total_size}")
-    elif (file_size := download_path.stat().st_size) != total_size:
+    elif (file_size := path.stat().st_size) != total_size:
         raise RuntimeError(f"Downloaded size mismatch: {file_size}/{total_size}")
     elif (actual_md5 := hasher.hexdigest()) != content_md5:
         raise RuntimeError(f"Downloaded md5 mismatch: {actual_md5=} {content_md5=}")
+    return transfer_size
+
+
+async def download_and_extract_binary(
+    client: AsyncClient, url: str, mirrors: Sequence[str] = ()
+):
+    begin_time = time.time()
+    download_path = Path(mktemp(suffix=ARCHIVE_EXT))
+    try:
+        transfer_size = await download_segmented(client, [url, *mirrors], download_path)
+    except RangeNotSupported as e:
+        logger.debug(f"{e}, downloading in a single stream")
+        transfer_size = await download_single(client, url, download_path)
+
+    DownloadStats.download_seconds = time.time() - begin_time
+    DownloadStats.download_bytes = transfer_size
 
     logger.debug(f"Extracting binary file to <e>{BINARY_PATH}</e>")
     await unarchive_file(download_path)
@@ -121,9 +266,12 @@ async def download_gocq():
         for index, url in enumerate(available_urls):
             logger.info(f"Begin to Download binary from <u>{url}</u>")
             try:
-                await download_and_extract_binary(client, url)
+                await download_and_extract_binary(
+                    client, url, available_urls[index + 1 :]
+                )
                 break
             except Exception as e:
+                DownloadStats.failures += 1
                 logger.opt(exception=e).warning(
                     f"Failed to download from <u>{url}</u>, trying next mirror:"
                 )
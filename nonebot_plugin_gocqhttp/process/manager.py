@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -9,8 +10,13 @@ from nonebot_plugin_gocqhttp.exceptions import AccountAlreadyExists
 from nonebot_plugin_gocqhttp.plugin_config import AccountConfig
 from nonebot_plugin_gocqhttp.plugin_config import config as plugin_config
 from nonebot_plugin_gocqhttp.process.download import BINARY_DIR
-from nonebot_plugin_gocqhttp.process.models import ProcessAccountsStore
-from nonebot_plugin_gocqhttp.process.process import GoCQProcess
+from nonebot_plugin_gocqhttp.process.models import (
+    ProcessAccountsStore,
+    ProcessInfo,
+    ProcessStatus,
+)
+from nonebot_plugin_gocqhttp.process.process import AsyncGoCQProcess, GoCQProcess
+from nonebot_plugin_gocqhttp.process.scan import PROCESS_SCANNER
 
 ACCOUNTS_SAVE_PATH = BINARY_DIR / "accounts.json"
 ACCOUNTS_LEGACY_SAVE_PATH = BINARY_DIR / "accounts.pkl"
@@ -18,6 +24,7 @@ ACCOUNTS_LEGACY_SAVE_PATH = BINARY_DIR / "accounts.pkl"
 
 class ProcessesManager:
     _processes: Dict[int, GoCQProcess] = {}
+    startup_task: Optional["asyncio.Task[None]"] = None
 
     get = _processes.get
 
@@ -30,12 +37,20 @@ class ProcessesManager:
 
     @classmethod
     def create_instance(cls, account: AccountConfig, *, predefined: bool = False):
-        return GoCQProcess(account, predefined, **plugin_config.PROCESS_KWARGS)
+        process_class = (
+            AsyncGoCQProcess
+            if plugin_config.PROCESS_SUPERVISOR == "asyncio"
+            else GoCQProcess
+        )
+        return process_class(account, predefined, **plugin_config.PROCESS_KWARGS)
 
     @classmethod
     def remove(cls, uin: int):
         process = cls._processes.pop(uin)
+        process.metrics.stop()
         process.logs.listeners.clear()
+        for subscriber in [*process.logs.subscribers]:
+            subscriber.close()
         return
 
     @classmethod
@@ -46,6 +61,68 @@ class ProcessesManager:
             if include_predefined or not process.predefined
         ]
 
+    @classmethod
+    async def start_all(cls, processes: Optional[List[GoCQProcess]] = None):
+        """Start processes by priority, within the startup concurrency and rate."""
+        processes = sorted(
+            cls.all() if processes is None else processes,
+            key=lambda process: process.account.priority,
+            reverse=True,
+        )
+        for process in processes:
+            process.queued = True
+            process.notify_status()
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(plugin_config.STARTUP_CONCURRENCY)
+        interval = 1 / plugin_config.STARTUP_RATE if plugin_config.STARTUP_RATE else 0
+
+        async def start(process: GoCQProcess):
+            try:
+                if process.queued:
+                    await process.start()
+            except Exception:
+                logger.exception(f"Failed to start process for {process.account.uin}:")
+            finally:
+                semaphore.release()
+
+        tasks, launched_at = [], -interval
+        try:
+            with PROCESS_SCANNER.wave():
+                for process in processes:
+                    if not process.queued:
+                        continue
+                    await semaphore.acquire()
+                    await asyncio.sleep(launched_at + interval - loop.time())
+                    launched_at = loop.time()
+                    tasks.append(loop.create_task(start(process)))
+                await asyncio.gather(*tasks)
+        finally:
+            for process in processes:
+                process.queued = False
+
+    @classmethod
+    def status_all(cls) -> Dict[int, ProcessInfo]:
+        """Status of every process from their latest samples, including failures."""
+        statuses: Dict[int, ProcessInfo] = {}
+        for uin, process in cls._processes.items():
+            try:
+                statuses[uin] = process.status_snapshot()
+            except Exception as e:
+                logger.opt(exception=e).warning(f"Failed to get status of {uin}:")
+                statuses[uin] = ProcessInfo(
+                    status=(
+                        ProcessStatus.stopped
+                        if process.pid is None
+                        else ProcessStatus.running
+                    ),
+                    total_logs=process.logs.count,
+                    restarts=process.restart_count,
+                    error=repr(e),
+                    details=None,
+                )
+        return statuses
+
     @classmethod
     async def save(cls, save_path: Path = ACCOUNTS_SAVE_PATH) -> int:
         store = ProcessAccountsStore(
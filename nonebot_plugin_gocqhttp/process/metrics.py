@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+import psutil
+
+from .models import ProcessMetrics
+
+
+class ProcessMetricsSampler:
+    """Sample resource usage of a child process at a fixed interval."""
+
+    def __init__(
+        self,
+        pid_of: Callable[[], Optional[int]],
+        *,
+        interval: float = 5,
+        history_size: int = 720,
+        on_sample: Optional[Callable[[ProcessMetrics], Any]] = None,
+    ):
+        self.pid_of, self.interval = pid_of, interval
+        self.on_sample = on_sample
+        self.history: Deque[ProcessMetrics] = deque(maxlen=history_size)
+        self.handle: Optional[psutil.Process] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.wakeup = asyncio.Event()
+
+    @property
+    def latest(self) -> Optional[ProcessMetrics]:
+        return self.history[-1] if self.history else None
+
+    def sample(self, pid: int) -> ProcessMetrics:
+        if self.handle is None or self.handle.pid != pid:
+            self.handle = psutil.Process(pid)
+            self.handle.cpu_percent()  # set the baseline of the next reading
+        with self.handle.oneshot():
+            return ProcessMetrics(
+                time=time.time(),
+                pid=pid,
+                status=self.handle.status(),
+                cpu_percent=self.handle.cpu_percent(),
+                memory_used=self.handle.memory_info().rss,
+                threads=self.handle.num_threads(),
+                fds=(
+                    self.handle.num_handles()
+                    if psutil.WINDOWS
+                    else self.handle.num_fds()
+                ),
+                start_time=self.handle.create_time(),
+            )
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            if (pid := self.pid_of()) is None:
+                self.handle = None
+            else:
+                try:
+                    self.history.append(metrics := self.sample(pid))
+                except psutil.Error:
+                    self.handle = None
+                else:
+                    if self.on_sample is not None:
+                        self.on_sample(metrics)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.handle = None
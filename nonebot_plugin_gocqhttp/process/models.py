@@ -1,6 +1,7 @@
+import json
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -24,14 +25,53 @@ class ProcessLogLevel(str, Enum):
 
 
 class ProcessLog(BaseModel):
+    seq: Optional[int] = None
     time: datetime = Field(default_factory=datetime.now)
     level: ProcessLogLevel = ProcessLogLevel.STDOUT
     message: str
 
 
+class ProcessLogRecord:
+    """Lightweight in-memory form of `ProcessLog`, built without validation."""
+
+    __slots__ = ("time", "level", "message", "encoded")
+
+    def __init__(
+        self,
+        message: str,
+        level: ProcessLogLevel = ProcessLogLevel.STDOUT,
+        time: Optional[datetime] = None,
+    ):
+        self.message, self.level = message, level
+        self.time = time or datetime.now()
+        self.encoded: Optional[str] = None
+
+    def __repr__(self):
+        return f"<{type(self).__name__} [{self.level.value}] {self.message!r}>"
+
+    def to_model(self, seq: Optional[int] = None) -> ProcessLog:
+        return ProcessLog.construct(
+            seq=seq, time=self.time, level=self.level, message=self.message
+        )
+
+    def frame(self, seq: int) -> str:
+        """JSON form of `to_model`, encoded once and shared by every consumer."""
+        if self.encoded is None:
+            self.encoded = json.dumps(
+                {
+                    "seq": seq,
+                    "time": self.time.isoformat(),
+                    "level": self.level.value,
+                    "message": self.message,
+                }
+            )
+        return self.encoded
+
+
 class ProcessStatus(str, Enum):
     running = "running"
     stopped = "stopped"
+    queued = "queued"
 
 
 class RunningProcessDetail(BaseModel):
@@ -46,9 +86,31 @@ class StoppedProcessDetail(BaseModel):
     code: int
 
 
+class ProcessMetrics(BaseModel):
+    time: float
+    pid: int
+    status: str
+    cpu_percent: float
+    memory_used: int
+    threads: int
+    fds: int
+    start_time: float
+
+
+class StageHistogram(BaseModel):
+    count: int
+    total_ns: int
+    max_ns: int
+    buckets: Dict[int, int] = Field(
+        description="Counts keyed by the exclusive upper bound in nanoseconds"
+    )
+
+
 class ProcessInfo(BaseModel):
     status: ProcessStatus
     total_logs: int
     restarts: int
-    qr_uri: Optional[str] = None
+    crash_loop: bool = False
+    qr_version: Optional[str] = None
+    error: Optional[str] = None
     details: Optional[Union[RunningProcessDetail, StoppedProcessDetail]]
@@ -1,33 +1,58 @@
 import asyncio
-import mimetypes
+import contextlib
 import os
 import re
 import shutil
 import subprocess
+import sys
 import threading
 import time
-from base64 import b64encode
+from datetime import datetime
 from itertools import count
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Optional, TypeVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    TypeVar,
+)
 
 import psutil
 from nonebot.utils import escape_tag, run_sync
 
 from ..exceptions import ProcessAlreadyStarted
+from ..log import LogBatcher
 from ..log import LogStorage as BaseLogStorage
 from ..log import logger
 from ..plugin_config import AccountConfig
 from ..plugin_config import config as plugin_config
-from .config import AccountConfigHelper, AccountDeviceHelper, SessionTokenHelper
+from .archive import LogArchive
+from .config import (
+    AccountConfigHelper,
+    AccountDeviceHelper,
+    PidFileHelper,
+    QRCodeHelper,
+    SessionTokenHelper,
+)
 from .download import ACCOUNTS_DATA_PATH, BINARY_PATH
+from .metrics import ProcessMetricsSampler
 from .models import (
     ProcessInfo,
-    ProcessLog,
+    ProcessLogLevel,
+    ProcessLogRecord,
+    ProcessMetrics,
     ProcessStatus,
     RunningProcessDetail,
     StoppedProcessDetail,
 )
+from .profiling import StageProfiler
+from .restart import RestartBackoff
+from .scan import PROCESS_SCANNER
 
 LOG_REGEX = re.compile(
     r"^"
@@ -37,20 +62,26 @@ LOG_REGEX = re.compile(
     r"$"
 )
 STARTUP_FINISH_PROMPT = "アトリは、高性能ですから!"
+PROCESS_ARGS = ("-faststart", "-update-protocol")
+LOG_LEVELS = {level.value: level for level in ProcessLogLevel}
+PID_CREATE_TIME_TOLERANCE = 1
 
 
-LogListener = Callable[[ProcessLog], Awaitable[Any]]
+LogListener = Callable[[Sequence[ProcessLogRecord]], Awaitable[Any]]
 LogListener_T = TypeVar("LogListener_T", bound=LogListener)
 
 
-class LogStorage(BaseLogStorage[ProcessLog]):
-    pass
+class LogStorage(BaseLogStorage[ProcessLogRecord]):
+    def __init__(self, rotation: float = 5 * 60, max_size: int = 10000):
+        super().__init__(rotation, max_size, level_of=attrgetter("level.value"))
 
 
 class GoCQProcess:
     process: Optional[subprocess.Popen] = None
     worker_thread: Optional[threading.Thread] = None
     worker_thread_running = False
+    queued = False
+    profiler: Optional[StageProfiler] = None
 
     def __init__(
         self,
@@ -61,8 +92,20 @@ class GoCQProcess:
         stop_timeout: float = 6,
         max_restarts: int = -1,
         restart_interval: float = 3,
+        restart_max_interval: float = 300,
+        restart_jitter: float = 0.5,
+        restart_stable_uptime: float = 60,
+        crash_loop_restarts: int = 5,
+        crash_loop_window: float = 300,
         print_process_log: bool = True,
         log_rotation: float = 5 * 60,
+        log_max_size: int = 10000,
+        log_archive: bool = False,
+        log_archive_segment_size: int = 16 * 2**20,
+        log_archive_max_segments: int = 64,
+        metrics_interval: float = 5,
+        metrics_history: int = 720,
+        profile_stages: bool = False,
         post_delay: float = 3,
     ):
         self.cwd = (ACCOUNTS_DATA_PATH / str(account.uin)).absolute()
@@ -75,26 +118,70 @@ class GoCQProcess:
         if not self.device.exists:
             self.device.generate()
         self.session = SessionTokenHelper(account)
+        self.qrcode = QRCodeHelper(account)
+        self.pidfile = PidFileHelper(account)
 
         self.account, self.predefined = account, predefined
 
         self.loop = asyncio.get_running_loop()
 
         self.stop_timeout, self.kill_timeout = stop_timeout, kill_timeout
-        self.max_restarts, self.restart_interval = max_restarts, restart_interval
+        self.max_restarts, self.worker_stop = max_restarts, threading.Event()
+        self.backoff = RestartBackoff(
+            restart_interval,
+            restart_max_interval,
+            jitter=restart_jitter,
+            stable_uptime=restart_stable_uptime,
+            crash_loop_restarts=crash_loop_restarts,
+            crash_loop_window=crash_loop_window,
+        )
         self.post_delay = post_delay
 
-        self.logs, self.restart_count = LogStorage(log_rotation), 0
+        self.logs, self.restart_count = LogStorage(log_rotation, log_max_size), 0
+        self.exit_code: Optional[int] = None
+        self.status_changed = asyncio.Event()
+        self.metrics = ProcessMetricsSampler(
+            lambda: self.pid,
+            interval=metrics_interval,
+            history_size=metrics_history,
+            on_sample=lambda _: self._notify_status(),
+        )
 
-        async def process_log(log: ProcessLog):
-            logger.log(
-                log.level.name,
-                f"<d>[{self.account.uin}]</d> {escape_tag(log.message)}",
-            )
+        self.profiler = StageProfiler() if profile_stages else None
+        if self.profiler is not None:
+            self.logs.stage_timer = self.profiler.record
+
+        async def process_log(logs: Sequence[ProcessLogRecord]):
+            if self.profiler is not None:
+                begin = time.perf_counter_ns()
+            for log in logs:
+                logger.log(
+                    log.level.name,
+                    f"<d>[{self.account.uin}]</d> {escape_tag(log.message)}",
+                )
+            if self.profiler is not None:
+                self.profiler.record("console", time.perf_counter_ns() - begin)
 
         if print_process_log:
             self.logs.listeners.add(process_log)
 
+        self.archive = (
+            LogArchive(
+                self.cwd / "logs",
+                segment_size=log_archive_segment_size,
+                max_segments=log_archive_max_segments,
+            )
+            if log_archive
+            else None
+        )
+
+        async def archive_logs(logs: Sequence[ProcessLogRecord]):
+            assert self.archive
+            self.archive.put_many(logs)
+
+        if self.archive:
+            self.logs.listeners.add(archive_logs)
+
         from .manager import ProcessesManager
 
         ProcessesManager.add(self, account.uin)
@@ -110,92 +197,195 @@ class GoCQProcess:
         except subprocess.TimeoutExpired:
             process.kill()
 
-    def _process_executor(self) -> int:
-        executable_path = BINARY_PATH
+    def _notify_status(self):
+        changed, self.status_changed = self.status_changed, asyncio.Event()
+        changed.set()
+
+    def notify_status(self):
+        """Wake up everyone waiting on `status_changed`, from any thread."""
+        self.loop.call_soon_threadsafe(self._notify_status)
+
+    def _process_spawned(self, pid: int):
+        """Called from any thread once a new child is running."""
+        self._write_pidfile(pid)
+        self.loop.call_soon_threadsafe(self.metrics.wake)
+        self.notify_status()
+
+    @property
+    def pid(self) -> Optional[int]:
+        """Pid of the running child, or None if there is none."""
+        if self.process is None or self.process.returncode is not None:
+            return None
+        return self.process.pid
+
+    @staticmethod
+    def _executable_path() -> Path:
         if plugin_config.PROCESS_EXECUTABLE == "@PATH" and (
             exec_file := shutil.which(BINARY_PATH.name)
         ):
-            executable_path = Path(exec_file)
+            return Path(exec_file)
         elif isinstance(plugin_config.PROCESS_EXECUTABLE, Path):
-            executable_path = plugin_config.PROCESS_EXECUTABLE
+            return plugin_config.PROCESS_EXECUTABLE
+        return BINARY_PATH
+
+    @staticmethod
+    def _process_env() -> Dict[str, str]:
+        # see: https://github.com/ifrstr/isatty#using-force_tty
+        return {**os.environ, "FORCE_TTY": "true"}
+
+    def _parse_output(self, output: bytes) -> ProcessLogRecord:
+        if (profiler := self.profiler) is not None:
+            begin = time.perf_counter_ns()
+        line = output.strip().decode("utf-8", "replace")
+        if profiler is not None:
+            decoded = time.perf_counter_ns()
+            profiler.record("decode", decoded - begin)
+
+        if STARTUP_FINISH_PROMPT in line:
+            logger.success(
+                f"go-cqhttp for <e>{self.account.uin}</e> has successfully started."
+            )
+
+        log_matched = LOG_REGEX.match(line)
+        if profiler is not None:
+            matched = time.perf_counter_ns()
+            profiler.record("match", matched - decoded)
+
+        if log_matched and (level := LOG_LEVELS.get(log_matched["level"])):
+            record = ProcessLogRecord(
+                log_matched["message"],
+                level,
+                # fixed "YYYY-MM-DD HH:MM:SS" layout is guaranteed by LOG_REGEX
+                datetime.fromisoformat(log_matched["time"]),
+            )
+        else:
+            record = ProcessLogRecord(line)
+        if profiler is not None:
+            profiler.record("build", time.perf_counter_ns() - matched)
+        return record
+
+    def _read_output(self, readline: Callable[[], bytes]) -> Iterator[bytes]:
+        if (profiler := self.profiler) is None:
+            yield from iter(readline, b"")
+            return
+        while True:
+            begin = time.perf_counter_ns()
+            output = readline()
+            profiler.record("read", time.perf_counter_ns() - begin)
+            if not output:
+                return
+            yield output
 
+    def _process_executor(self) -> int:
         self.process = subprocess.Popen(
-            [executable_path.absolute(), "-faststart", "-update-protocol"],
+            [self._executable_path().absolute(), *PROCESS_ARGS],
             cwd=self.cwd.absolute(),
-            env={
-                **os.environ,
-                "FORCE_TTY": "true",
-            },  # see: https://github.com/ifrstr/isatty#using-force_tty
+            env=self._process_env(),
             text=False,  # fix possible encoding error, see: #341
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
         )
         assert self.process.stdout and self.process.stdin
+        self._process_spawned(self.process.pid)
 
-        for output in iter(self.process.stdout.readline, b""):
-            output = output.strip().decode("utf-8", "replace")
-            if STARTUP_FINISH_PROMPT in output:
-                logger.success(
-                    "go-cqhttp for "
-                    f"<e>{self.account.uin}</e> has successfully started."
-                )
-
-            log_matched = LOG_REGEX.match(output)
-            log_model = (
-                ProcessLog.parse_obj(log_matched.groupdict())
-                if log_matched
-                else ProcessLog(message=output)
-            )
-            asyncio.run_coroutine_threadsafe(self.logs.add(log_model), loop=self.loop)
+        batcher = LogBatcher(self.logs, self.loop)
+        for output in self._read_output(self.process.stdout.readline):
+            batcher.put(self._parse_output(output))
+        batcher.flush_threadsafe()
 
         if self.process.poll() is None:
             self._terminate_process(self.process, timeout=self.post_delay)
+        self._clear_pidfile()
 
         return self.process.returncode
 
+    def _restart_delay(self, code: Optional[int], uptime: float, restarted: int):
+        crash_loop = self.backoff.crash_loop
+        delay = self.backoff.next_delay(uptime)
+        logger.warning(
+            f"<b>Process for <e>{self.account.uin}</e> exited</b> "
+            f"with code <r>{code}</r>, restarting in <y>{delay:.1f}s</y>... "
+            f"<y>({restarted}/{self.max_restarts})</y>"
+        )
+        if self.backoff.crash_loop and not crash_loop:
+            logger.error(
+                f"Process for <e>{self.account.uin}</e> is in a crash loop, "
+                f"<r>{self.backoff.recent_crashes}</r> crashes within "
+                f"{self.backoff.crash_loop_window}s"
+            )
+        self.restart_count, self.exit_code = self.restart_count + 1, code
+        self.notify_status()
+        return delay
+
     def _process_worker(self):
+        stop = self.worker_stop
         for restarted in count():
-            if not self.worker_thread_running:
+            if stop.is_set():
                 break
             if self.max_restarts >= 0 and restarted >= self.max_restarts:
                 break
 
-            code = None
+            code, begin = None, time.monotonic()
             try:
                 code = self._process_executor()
             except Exception:
                 logger.exception(
                     f"Thread {self.worker_thread!r} raised unknown exception:"
                 )
-            logger.warning(
-                f"<b>Process for <e>{self.account.uin}</e> exited</b> "
-                f"with code <r>{code}</r>, retrying to restart... "
-                f"<y>({restarted}/{self.max_restarts})</y>"
+            if stop.is_set():
+                break
+            stop.wait(self._restart_delay(code, time.monotonic() - begin, restarted))
+
+    def _write_pidfile(self, pid: int):
+        try:
+            self.pidfile.write(pid, psutil.Process(pid).create_time())
+        except (psutil.Error, OSError):
+            logger.opt(exception=True).debug(
+                f"Failed to write pidfile for <e>{self.account.uin}</e>:"
             )
-            self.restart_count += 1
-            time.sleep(self.restart_interval)
+
+    def _clear_pidfile(self):
+        with contextlib.suppress(OSError):
+            self.pidfile.clear()
+
+    @staticmethod
+    def _terminate_pid(pid: int, create_time: float) -> Optional[int]:
+        try:
+            process = psutil.Process(pid)
+            # creation time is derived from the boot time, which may drift
+            if abs(process.create_time() - create_time) > PID_CREATE_TIME_TOLERANCE:
+                return None
+            process.terminate()
+        except psutil.Error:
+            return None
+        return pid
 
     async def _find_duplicate_process(self):
-        for process in psutil.process_iter():
+        if self.pidfile.exists:
+            try:
+                previous = self.pidfile.read()
+            except (OSError, ValueError):
+                pass  # unreadable, look for it below
+            else:
+                if previous is None:
+                    return  # emptied by a clean exit
+                if (pid := self._terminate_pid(*previous)) is not None:
+                    yield pid
+                    return
+
+        if not (executable := self._executable_path().absolute()).is_file():
+            return
+        for process in await PROCESS_SCANNER.find(self.cwd, executable):
             try:
-                with process.oneshot():
-                    pid = process.pid
-                    cwd = Path(process.cwd()).absolute()
-                    exe = Path(process.exe()).absolute()
+                process.terminate()
             except psutil.Error:
                 continue
-            if not (exe.is_file() and cwd.is_dir()):
-                continue
-            if BINARY_PATH.absolute().samefile(exe) and self.cwd.samefile(cwd):
-                process.terminate()
-                yield pid
+            PROCESS_SCANNER.discard(process)
+            yield process.pid
         return
 
-    async def start(self):
-        if self.worker_thread_running:
-            raise ProcessAlreadyStarted
-
+    async def _prepare_start(self):
         async for duplicate_pid in self._find_duplicate_process():
             logger.warning(f"Possible {duplicate_pid=} found, terminated.")
 
@@ -207,37 +397,45 @@ class GoCQProcess:
             self.device.generate()
         self.device.before_run()
 
+    async def start(self):
+        self.queued = False
+        if self.worker_thread_running:
+            raise ProcessAlreadyStarted
+
+        await self._prepare_start()
+
         self.worker_thread_running = True
+        self.worker_stop = threading.Event()
+        self.backoff.reset()
         self.worker_thread = threading.Thread(target=self._process_worker, daemon=True)
         self.worker_thread.name = f"daemon-thread-{self.account.uin}"
         self.worker_thread.start()
+        self.metrics.start()
 
         await asyncio.sleep(self.post_delay)
 
-    @run_sync
-    def stop(self):
+    async def stop(self):
+        self.queued = False
+        self.metrics.stop()
+        await run_sync(self._stop_worker)()
+        self.notify_status()
+
+    def _stop_worker(self):
         self.worker_thread_running = False
+        self.worker_stop.set()
         if self.process is not None:
             self._terminate_process(self.process, timeout=self.post_delay)
         if self.worker_thread and self.worker_thread.is_alive():
             self.worker_thread.join(self.stop_timeout)
             self.worker_thread = None
 
-    @run_sync
-    def status(self) -> ProcessInfo:
-        qr_path = self.cwd / "qrcode.png"
-        if qr_path.exists():
-            mimetype, _ = mimetypes.guess_type(qr_path)
-            qr_data = qr_path.read_bytes()
-            qr_uri = f"data:{mimetype};base64,{b64encode(qr_data).decode()}"
-        else:
-            qr_uri = None
-
+    def _status_info(self, metrics: Optional[ProcessMetrics]) -> ProcessInfo:
         if not self.process or self.process.returncode is not None:
             return ProcessInfo(
-                status=ProcessStatus.stopped,
+                status=ProcessStatus.queued if self.queued else ProcessStatus.stopped,
                 total_logs=self.logs.count,
                 restarts=self.restart_count,
+                crash_loop=self.backoff.crash_loop,
                 details=(
                     StoppedProcessDetail(code=self.process.returncode)
                     if self.process
@@ -245,29 +443,175 @@ class GoCQProcess:
                 ),
             )
 
-        with (ps := psutil.Process(self.process.pid)).oneshot():
-            cpu = ps.cpu_percent()
-            status = ps.status()
-            memory = ps.memory_info()
-            create_time = ps.create_time()
-
         return ProcessInfo(
             status=ProcessStatus.running,
             total_logs=self.logs.count,
             restarts=self.restart_count,
-            qr_uri=qr_uri,
-            details=RunningProcessDetail(
-                pid=self.process.pid,
-                status=status,
-                memory_used=memory.rss,
-                cpu_percent=cpu,
-                start_time=create_time,
+            crash_loop=self.backoff.crash_loop,
+            qr_version=self.qrcode.version,
+            details=(
+                RunningProcessDetail(
+                    pid=metrics.pid,
+                    status=metrics.status,
+                    memory_used=metrics.memory_used,
+                    cpu_percent=metrics.cpu_percent,
+                    start_time=metrics.start_time,
+                )
+                if metrics
+                else None
             ),
         )
 
+    async def status(self) -> ProcessInfo:
+        return self.status_snapshot()
+
+    def status_snapshot(self) -> ProcessInfo:
+        """Status from the latest sample of the sampler."""
+        metrics = self.metrics.latest
+        if metrics is not None and metrics.pid != self.pid:
+            metrics = None
+        return self._status_info(metrics)
+
     @run_sync
     def write_stdin(self, data: bytes):
         assert self.process and self.process.stdin
         wrote = self.process.stdin.write(data)
         self.process.stdin.flush()
         return wrote
+
+
+def use_pidfd_child_watcher(loop: asyncio.AbstractEventLoop):
+    # before 3.12, asyncio waits for each child from a thread of its own unless
+    # told otherwise, while 3.8 and kernels before 5.3 have no pidfd to use
+    if not (3, 9) <= sys.version_info < (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    if isinstance(asyncio.get_child_watcher(), asyncio.PidfdChildWatcher):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+class AsyncGoCQProcess(GoCQProcess):
+    """Supervise go-cqhttp from a task on the event loop instead of a thread."""
+
+    process: Optional[asyncio.subprocess.Process] = None  # type: ignore
+    worker_task: Optional["asyncio.Task[None]"] = None
+
+    STREAM_LIMIT = 2**20
+
+    @staticmethod
+    async def _terminate_async(process: asyncio.subprocess.Process, *, timeout: float):
+        if process.returncode is not None:
+            return process.returncode
+        with contextlib.suppress(ProcessLookupError):
+            process.terminate()
+        try:
+            return await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+        return await process.wait()
+
+    async def _readline_async(self, stream: asyncio.StreamReader) -> bytes:
+        """Read a line, truncating it to ``STREAM_LIMIT`` bytes if it is longer."""
+        try:
+            return await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+        except asyncio.LimitOverrunError:
+            pass
+        head, dropped = await stream.read(self.STREAM_LIMIT), 0
+        while True:
+            try:
+                dropped += len(await stream.readuntil(b"\n"))
+            except asyncio.IncompleteReadError as e:
+                dropped += len(e.partial)
+            except asyncio.LimitOverrunError as e:
+                dropped += len(await stream.read(e.consumed))
+                continue
+            return head + b" [truncated %d bytes]\n" % dropped
+
+    async def _read_output_async(self, stream: asyncio.StreamReader) -> bytes:
+        if (profiler := self.profiler) is None:
+            return await self._readline_async(stream)
+        begin = time.perf_counter_ns()
+        output = await self._readline_async(stream)
+        profiler.record("read", time.perf_counter_ns() - begin)
+        return output
+
+    async def _run_process(self) -> int:
+        self.process = process = await asyncio.create_subprocess_exec(
+            self._executable_path().absolute(),
+            *PROCESS_ARGS,
+            cwd=self.cwd.absolute(),
+            env=self._process_env(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=self.STREAM_LIMIT,
+        )
+        assert process.stdout and process.stdin
+        self._process_spawned(process.pid)
+
+        try:
+            while output := await self._read_output_async(process.stdout):
+                await self.logs.add(self._parse_output(output))
+            # signalling an exited but unreaped child would reap it behind the
+            # back of asyncio's child watcher, losing its exit code
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(process.wait(), self.post_delay)
+        finally:
+            code = await self._terminate_async(process, timeout=self.post_delay)
+            self._clear_pidfile()
+        return code
+
+    async def _supervise(self):
+        for restarted in count():
+            if self.max_restarts >= 0 and restarted >= self.max_restarts:
+                break
+
+            code, begin = None, time.monotonic()
+            try:
+                code = await self._run_process()
+            except Exception:
+                logger.exception(
+                    f"Supervisor of <e>{self.account.uin}</e> raised unknown exception:"
+                )
+            await asyncio.sleep(
+                self._restart_delay(code, time.monotonic() - begin, restarted)
+            )
+
+    async def start(self):
+        self.queued = False
+        if self.worker_task and not self.worker_task.done():
+            raise ProcessAlreadyStarted
+
+        await self._prepare_start()
+        use_pidfd_child_watcher(self.loop)
+
+        self.backoff.reset()
+        self.worker_task = self.loop.create_task(self._supervise())
+        self.metrics.start()
+
+        await asyncio.sleep(self.post_delay)
+
+    async def stop(self):
+        self.queued = False
+        self.metrics.stop()
+        task, self.worker_task = self.worker_task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.wait({task}, timeout=self.stop_timeout)
+        self.notify_status()
+
+    async def write_stdin(self, data: bytes):
+        assert self.process and self.process.stdin
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+        return len(data)
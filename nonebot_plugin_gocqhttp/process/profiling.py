@@ -0,0 +1,45 @@
+from typing import Dict, List, Sequence
+
+from .models import StageHistogram
+
+LOG_STAGES = (
+    "read",
+    "decode",
+    "match",
+    "build",
+    "handoff",
+    "insert",
+    "fanout",
+    "console",
+)
+
+
+class StageProfiler:
+    """Power-of-two latency histograms for the stages of the log pipeline."""
+
+    def __init__(self, stages: Sequence[str] = LOG_STAGES):
+        self.buckets: Dict[str, List[int]] = {stage: [0] * 64 for stage in stages}
+        self.totals: Dict[str, int] = dict.fromkeys(stages, 0)
+        self.maximums: Dict[str, int] = dict.fromkeys(stages, 0)
+
+    def record(self, stage: str, elapsed: int):
+        self.buckets[stage][min(elapsed.bit_length(), 63)] += 1
+        self.totals[stage] += elapsed
+        if elapsed > self.maximums[stage]:
+            self.maximums[stage] = elapsed
+
+    def reset(self):
+        for stage, buckets in self.buckets.items():
+            buckets[:] = [0] * len(buckets)
+            self.totals[stage] = self.maximums[stage] = 0
+
+    def snapshot(self) -> Dict[str, StageHistogram]:
+        return {
+            stage: StageHistogram(
+                count=sum(buckets),
+                total_ns=self.totals[stage],
+                max_ns=self.maximums[stage],
+                buckets={2**bit: count for bit, count in enumerate(buckets) if count},
+            )
+            for stage, buckets in self.buckets.items()
+        }
@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque
+
+from ..plugin_config import config as plugin_config
+
+
+class RestartBudget:
+    """Token bucket of restarts shared by all processes."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0)
+
+
+class RestartBackoff:
+    """Jittered exponential delays between the restarts of a single process."""
+
+    def __init__(
+        self,
+        initial: float = 3,
+        maximum: float = 300,
+        *,
+        multiplier: float = 2,
+        jitter: float = 0.5,
+        stable_uptime: float = 60,
+        crash_loop_restarts: int = 5,
+        crash_loop_window: float = 300,
+    ):
+        self.initial, self.maximum, self.multiplier = initial, maximum, multiplier
+        self.jitter, self.stable_uptime = jitter, stable_uptime
+        self.crash_loop_restarts = crash_loop_restarts
+        self.crash_loop_window = crash_loop_window
+        self.attempts = 0
+        self.crashes: Deque[float] = deque()
+        self.lock = threading.Lock()
+
+    @property
+    def recent_crashes(self) -> int:
+        expire_before = time.monotonic() - self.crash_loop_window
+        with self.lock:
+            while self.crashes and self.crashes[0] < expire_before:
+                self.crashes.popleft()
+            return len(self.crashes)
+
+    @property
+    def crash_loop(self) -> bool:
+        return self.recent_crashes >= self.crash_loop_restarts
+
+    def next_delay(self, uptime: float) -> float:
+        with self.lock:
+            if uptime >= self.stable_uptime:
+                self.attempts = 0
+                self.crashes.clear()
+            self.crashes.append(time.monotonic())
+
+            delay = min(self.initial * self.multiplier**self.attempts, self.maximum)
+            if delay < self.maximum:
+                self.attempts += 1
+        delay *= 1 - random.uniform(0, self.jitter)
+        return max(delay, RESTART_BUDGET.reserve())
+
+    def reset(self):
+        with self.lock:
+            self.attempts = 0
+            self.crashes.clear()
+
+
+RESTART_BUDGET = RestartBudget(
+    plugin_config.RESTART_BUDGET_RATE, plugin_config.RESTART_BUDGET_BURST
+)
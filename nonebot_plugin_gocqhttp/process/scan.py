@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psutil
+from nonebot.utils import run_sync
+
+ProcessIndex = Dict[Path, List[psutil.Process]]
+
+
+class ProcessScanner:
+    """Running processes by working directory, kept for a whole startup wave."""
+
+    def __init__(self):
+        self.index: Optional[ProcessIndex] = None
+        self.scanning: Optional["asyncio.Future[ProcessIndex]"] = None
+        self.waves = 0
+
+    @staticmethod
+    @run_sync
+    def _scan() -> ProcessIndex:
+        index: ProcessIndex = {}
+        for process in psutil.process_iter():
+            try:
+                cwd = Path(process.cwd())
+            except psutil.Error:
+                continue
+            index.setdefault(cwd, []).append(process)
+        return index
+
+    async def _refresh(self) -> ProcessIndex:
+        if (scanning := self.scanning) is None:
+            scanning = self.scanning = asyncio.ensure_future(self._scan())
+        try:
+            index = await asyncio.shield(scanning)
+        finally:
+            if scanning.done() and self.scanning is scanning:
+                self.scanning = None
+        if self.waves:
+            self.index = index
+        return index
+
+    @contextlib.contextmanager
+    def wave(self):
+        self.waves += 1
+        try:
+            yield
+        finally:
+            self.waves -= 1
+            if not self.waves:
+                self.index = None
+
+    async def find(self, cwd: Path, executable: Path) -> List[psutil.Process]:
+        """Running processes of ``executable`` with ``cwd`` as working directory."""
+        index = self.index if self.index is not None else await self._refresh()
+        found = []
+        for process in index.get(cwd.resolve(), []):
+            try:
+                exe = Path(process.exe())
+            except psutil.Error:
+                continue
+            if exe.is_file() and executable.samefile(exe):
+                found.append(process)
+        return found
+
+    def discard(self, process: psutil.Process):
+        for processes in (self.index or {}).values():
+            if process in processes:
+                processes.remove(process)
+
+
+PROCESS_SCANNER = ProcessScanner()
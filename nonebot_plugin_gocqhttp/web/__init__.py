@@ -6,7 +6,7 @@ from typing import Any, Awaitable, Callable, cast
 from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketException
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.requests import HTTPConnection, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.staticfiles import StaticFiles
 from starlette.status import WS_1008_POLICY_VIOLATION
@@ -15,6 +15,7 @@ from ..exceptions import PluginGoCQException
 from ..log import AccessLogFilter
 from ..plugin_config import config as plugin_config
 from .api import router as api_router
+from .metrics import METRICS_CONTENT_TYPE, render_metrics
 
 DIST_PATH = Path(__file__).parent / "dist"
 
@@ -80,4 +81,10 @@ app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 app.include_router(api_router, prefix="/api")
 
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 app.mount("/", StaticFiles(directory=DIST_PATH, html=True), name="frontend")
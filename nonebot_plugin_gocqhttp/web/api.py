@@ -1,31 +1,66 @@
 import asyncio
 import base64
+import json
 import os
+import re
 import shutil
-from datetime import timedelta
-from typing import Any, Dict, List, Optional, cast
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
-import psutil
-from fastapi import APIRouter, Depends
-from nonebot import get_bots
-from nonebot.adapters.onebot.v11 import ActionFailed, Bot
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from nonebot.adapters.onebot.v11 import Bot
 from nonebot.utils import escape_tag, run_sync
+from starlette.status import WS_1013_TRY_AGAIN_LATER
 from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
 
 from ..exceptions import (
+    BadLogQuery,
     BotNotFound,
+    LogArchiveDisabled,
     ProcessNotFound,
+    ProfilingDisabled,
+    QRCodeNotFound,
     RemovePredefinedAccount,
     SessionTokenNotFound,
 )
-from ..log import LOG_STORAGE, logger
+from ..log import (
+    LOG_STORAGE,
+    GapSender,
+    LogGap,
+    LogSender,
+    LogStorage,
+    SystemLog,
+    logger,
+)
 from ..plugin_config import AccountConfig
-from ..process import GoCQProcess, ProcessesManager, ProcessInfo, ProcessLog
+from ..plugin_config import config as plugin_config
+from ..process import (
+    GoCQProcess,
+    ProcessesManager,
+    ProcessInfo,
+    ProcessLog,
+    ProcessLogLevel,
+    ProcessLogRecord,
+    ProcessMetrics,
+    StageHistogram,
+)
 from ..process.device.models import DeviceInfo
 from . import models
+from .bots import (
+    API_CACHE,
+    BOT_REGISTRY,
+    LOGIN_INFO_CACHE,
+    call_api,
+    refresh_login_info,
+)
+from .status import STATUS_COLLECTOR
 
 router = APIRouter(tags=["api"])
 
+_T = TypeVar("_T")
+
 
 def RunningProcess():
     async def dependency(uin: int):
@@ -37,96 +72,248 @@ def RunningProcess():
     return Depends(dependency)
 
 
-nickname_map: Dict[int, str] = {}
-
-
 @router.get("/accounts", response_model=List[models.AccountListItem])
-async def all_accounts(nickname_cache: timedelta = timedelta(minutes=5)):
-    async def get_nickname(bot: Bot):
-        login_info = await bot.get_login_info()
-        user_id, nickname = login_info["user_id"], login_info["nickname"]
-        nickname_map[user_id] = nickname
-        asyncio.get_running_loop().call_later(
-            nickname_cache.total_seconds(), lambda: nickname_map.pop(user_id)
+async def all_accounts():
+    accounts = []
+    for process in ProcessesManager.all():
+        uin = process.account.uin
+        # stale nicknames are served while being refreshed in the background
+        refresh_login_info(uin)
+        login_info = LOGIN_INFO_CACHE.get(uin)
+        accounts.append(
+            models.AccountListItem(
+                uin=uin,
+                predefined=process.predefined,
+                process_created=process.process is not None,
+                process_running=(
+                    process.process is not None and process.process.returncode is None
+                ),
+                process_connected=uin in BOT_REGISTRY,
+                nickname=login_info and login_info.get("nickname"),
+            )
         )
+    return accounts
 
-    await asyncio.gather(
-        *[
-            get_nickname(bot)
-            for bot in get_bots().values()
-            if isinstance(bot, Bot)
-            and not any(bot.self_id.endswith(f"{user_id}") for user_id in nickname_map)
-        ],
-        return_exceptions=True,
-    )
 
-    return [
-        models.AccountListItem(
-            uin=process.account.uin,
-            predefined=process.predefined,
-            process_created=process.process is not None,
-            process_running=(
-                process.process is not None and process.process.returncode is None
-            ),
-            process_connected=any(
-                isinstance(bot, Bot) and bot.self_id.endswith(f"{process.account.uin}")
-                for bot in get_bots().values()
-            ),
-            nickname=nickname_map.get(process.account.uin),
+@router.get("/cache", response_model=Dict[str, models.CacheStats])
+async def cache_stats():
+    return {
+        name: models.CacheStats(
+            size=len(cache.entries),
+            hits=cache.hits,
+            misses=cache.misses,
+            coalesced=cache.coalesced,
         )
-        for process in ProcessesManager.all()
-    ]
+        for name, cache in {"api": API_CACHE, "login_info": LOGIN_INFO_CACHE}.items()
+    }
 
 
 @router.get("/status", response_model=models.SystemStatus)
-def system_status():
-    virtual_memory = psutil.virtual_memory()._asdict()
-    disk_usage = psutil.disk_usage(path=os.getcwd())._asdict()
-    process = psutil.Process()
-    with process.oneshot():
-        cpu_percent = process.cpu_percent()
-        process_memory = process.memory_info()
-        process_start_time = process.create_time()
-        status = process.status()
-    return models.SystemStatus(
-        cpu_percent=psutil.cpu_percent(),
-        memory=models.SystemMemoryDetail(**virtual_memory),
-        disk=models.SystemDiskDetail(**disk_usage),
-        boot_time=psutil.boot_time(),
-        process=models.RunningProcessDetail(
-            pid=process.pid,
-            cpu_percent=cpu_percent,
-            status=status,
-            memory_used=process_memory.rss,
-            start_time=process_start_time,
+async def system_status():
+    return await STATUS_COLLECTOR.current()
+
+
+@router.get("/status/history", response_model=List[models.SystemStatus])
+async def system_status_history():
+    await STATUS_COLLECTOR.current()
+    return [*STATUS_COLLECTOR.history]
+
+
+@router.websocket("/status")
+async def system_status_realtime(websocket: WebSocket):
+    await websocket.accept()
+
+    async def sender():
+        status = await STATUS_COLLECTOR.current()
+        while True:
+            await websocket.send_text(status.json())
+            status = await STATUS_COLLECTOR.wait()
+
+    await serve_websocket(websocket, sender())
+    return
+
+
+@router.get("/status/processes", response_model=Dict[int, ProcessInfo])
+async def all_processes_status():
+    return ProcessesManager.status_all()
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def search_logs(
+    storage: LogStorage[_T],
+    cursor: models.LogCursor,
+    log_filter: models.LogFilter,
+    text_of: Callable[[_T], str],
+) -> List[Tuple[int, _T]]:
+    levels = None
+    if log_filter.level is not None:
+        try:
+            min_level = logger.level(log_filter.level.upper()).no
+        except ValueError:
+            raise BadLogQuery(f"Unknown log level {log_filter.level!r}") from None
+        levels = [
+            level
+            for level in storage.level_index
+            if logger.level(level).no >= min_level
+        ]
+
+    predicates: List[Callable[[str], Any]] = []
+    if (keyword := log_filter.keyword) is not None:
+        predicates.append(lambda text: keyword in text)
+    if log_filter.regex is not None:
+        try:
+            predicates.append(re.compile(log_filter.regex).search)
+        except re.error as e:
+            raise BadLogQuery(f"Bad regular expression: {e}") from None
+
+    return storage.query(
+        levels=levels,
+        predicate=(
+            (lambda log: all(predicate(text_of(log)) for predicate in predicates))
+            if predicates
+            else None
         ),
+        start_time=log_filter.start_time and log_filter.start_time.timestamp(),
+        end_time=log_filter.end_time and log_filter.end_time.timestamp(),
+        **cursor.dict(),
+    )
+
+
+def paginate_logs(
+    items: List[Tuple[int, _T]], response: Response
+) -> List[Tuple[int, _T]]:
+    if items:
+        response.headers[NEXT_CURSOR_HEADER] = str(items[-1][0])
+    return items
+
+
+def cursor_headers(items: List[Tuple[int, _T]]) -> Optional[Dict[str, str]]:
+    return {NEXT_CURSOR_HEADER: str(items[-1][0])} if items else None
+
+
+def encode_logs(items: List[Tuple[int, _T]], encoder: Callable[[int, _T], str]):
+    return Response(
+        "[" + ",".join(encoder(*item) for item in items) + "]",
+        media_type="application/json",
+        headers=cursor_headers(items),
+    )
+
+
+def stream_logs(
+    items: List[Tuple[int, _T]],
+    encoder: Callable[[int, _T], str],
+    chunk_size: int = 256,
+):
+    async def content():
+        for begin in range(0, len(items), chunk_size):
+            yield "".join(
+                encoder(*item) + "\n" for item in items[begin : begin + chunk_size]
+            )
+
+    return StreamingResponse(
+        content(),
+        media_type="application/x-ndjson",
+        headers=cursor_headers(items),
     )
 
 
 @router.get("/logs", response_model=List[str])
-async def system_logs_history(reverse: bool = False):
-    return LOG_STORAGE.list(reverse=reverse)
+async def system_logs_history(
+    response: Response,
+    cursor: models.LogCursor = Depends(),
+    log_filter: models.LogFilter = Depends(),
+):
+    items = search_logs(LOG_STORAGE, cursor, log_filter, attrgetter("text"))
+    return [log.text for _, log in paginate_logs(items, response)]
 
 
-@router.websocket("/logs")
-async def system_logs_realtime(websocket: WebSocket):
-    await websocket.accept()
+@router.get("/logs/stream", response_class=StreamingResponse)
+async def system_logs_stream(
+    cursor: models.LogCursor = Depends(),
+    log_filter: models.LogFilter = Depends(),
+):
+    items = search_logs(LOG_STORAGE, cursor, log_filter, attrgetter("text"))
+    return stream_logs(items, lambda _, log: json.dumps(log.text))
 
-    async def log_listener(log: str):
-        await websocket.send_text(log)
 
-    LOG_STORAGE.listeners.add(log_listener)
+async def drain_websocket(websocket: WebSocket):
+    """Discard incoming messages until the websocket is disconnected."""
     try:
         while websocket.client_state == WebSocketState.CONNECTED:
             recv = await websocket.receive()
             logger.trace(
-                f"{system_logs_realtime.__name__!r} received "
+                f"Websocket {websocket.url.path!r} received "
                 f"<e>{escape_tag(repr(recv))}</e>"
             )
     except WebSocketDisconnect:
         pass
+
+
+async def serve_websocket(websocket: WebSocket, sender: Awaitable[None]):
+    """Run ``sender`` until either it finishes or the websocket disconnects."""
+    receive_task = asyncio.ensure_future(drain_websocket(websocket))
+    send_task = asyncio.ensure_future(sender)
+    try:
+        await asyncio.wait(
+            {receive_task, send_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not receive_task.done():
+            await websocket.close()
+    finally:
+        receive_task.cancel()
+        send_task.cancel()
+
+
+def gap_message(gap: LogGap) -> str:
+    return (
+        f"{gap.missed} log(s) after #{gap.since} were already evicted, "
+        f"resuming from #{gap.resumed}"
+    )
+
+
+async def serve_log_subscriber(
+    websocket: WebSocket,
+    storage: LogStorage[_T],
+    sender: LogSender[_T],
+    since: Optional[int] = None,
+    gap_sender: Optional[GapSender] = None,
+):
+    subscriber = storage.subscribe(
+        sender,
+        max_pending=plugin_config.WEBSOCKET_QUEUE_SIZE,
+        overflow=plugin_config.WEBSOCKET_OVERFLOW,
+        since=since,
+        gap_sender=gap_sender,
+    )
+
+    receive_task = asyncio.ensure_future(drain_websocket(websocket))
+    try:
+        await asyncio.wait(
+            {receive_task, subscriber.task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not receive_task.done() and subscriber.lagged:
+            await websocket.close(WS_1013_TRY_AGAIN_LATER, reason="lagged")
+        elif not receive_task.done():
+            await websocket.close()
     finally:
-        LOG_STORAGE.listeners.remove(log_listener)
+        receive_task.cancel()
+        subscriber.close()
+    return
+
+
+@router.websocket("/logs")
+async def system_logs_realtime(websocket: WebSocket, since: Optional[int] = None):
+    await websocket.accept()
+
+    async def log_sender(seq: int, log: SystemLog):
+        await websocket.send_text(log.text)
+
+    async def gap_sender(gap: LogGap):
+        await websocket.send_text(gap_message(gap))
+
+    await serve_log_subscriber(websocket, LOG_STORAGE, log_sender, since, gap_sender)
     return
 
 
@@ -222,25 +409,68 @@ def account_session_delete(process: GoCQProcess = RunningProcess()):
     process.session.delete()
 
 
+@router.get(
+    "/{uin}/qrcode",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}}}, 304: {}},
+)
+def account_qrcode(request: Request, process: GoCQProcess = RunningProcess()):
+    if (image := process.qrcode.read()) is None:
+        raise QRCodeNotFound
+    etag = f'"{image.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(image.content, media_type=image.mimetype, headers=headers)
+
+
 @router.post("/{uin}/api")
 async def account_api(
     name: str, params: Dict[str, Any], process: GoCQProcess = RunningProcess()
 ):
-    bot = next(
-        (
-            bot
-            for bot in get_bots().values()
-            if isinstance(bot, Bot) and bot.self_id.endswith(f"{process.account.uin}")
-        ),
-        None,
-    )
-    if not bot:
+    if not (bot := BOT_REGISTRY.get(process.account.uin)):
         raise BotNotFound
-    try:
-        result = await cast(Bot, bot).call_api(name, **params)
-    except ActionFailed as e:
-        result = e.info
-    return result
+    return await call_api(bot, name, params)
+
+
+async def call_actions(calls: List[Tuple[Optional[Bot], models.ApiAction]]):
+    """Run API calls concurrently, returning their results in order."""
+    semaphore = asyncio.Semaphore(plugin_config.API_CONCURRENCY)
+
+    async def call(bot: Optional[Bot], action: models.ApiAction):
+        if bot is None:
+            return {"status": "failed", "retcode": -1, "msg": BotNotFound.message}
+        async with semaphore:
+            try:
+                return await call_api(bot, action.name, action.params)
+            except Exception as e:
+                logger.opt(exception=e).debug(
+                    f"API call <y>{escape_tag(action.name)}</y> "
+                    f"of <e>{bot.self_id}</e> failed:"
+                )
+                return {"status": "failed", "retcode": -1, "msg": repr(e)}
+
+    return await asyncio.gather(*(call(bot, action) for bot, action in calls))
+
+
+@router.post("/{uin}/api/batch", response_model=List[Any])
+async def account_api_batch(
+    actions: List[models.ApiAction], process: GoCQProcess = RunningProcess()
+):
+    if not (bot := BOT_REGISTRY.get(process.account.uin)):
+        raise BotNotFound
+    return await call_actions([(bot, action) for action in actions])
+
+
+@router.post("/broadcast", response_model=Dict[int, Any])
+async def api_broadcast(broadcast: models.ApiBroadcast):
+    accounts = (
+        [*BOT_REGISTRY.bots] if broadcast.accounts is None else broadcast.accounts
+    )
+    results = await call_actions(
+        [(BOT_REGISTRY.get(uin), broadcast) for uin in accounts]
+    )
+    return dict(zip(accounts, results))
 
 
 @router.put("/{uin}/process", response_model=ProcessInfo, status_code=201)
@@ -259,12 +489,117 @@ async def process_status(process: GoCQProcess = RunningProcess()):
     return await process.status()
 
 
-@router.get("/{uin}/process/logs", response_model=List[ProcessLog])
+STATUS_CPU_THRESHOLD = 5  # percentage points
+STATUS_MEMORY_THRESHOLD = 0.05  # relative to the last pushed value
+
+
+def status_details_changed(
+    previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]
+) -> bool:
+    if previous is None or current is None or "cpu_percent" not in current:
+        return previous != current
+    if previous.keys() != current.keys():
+        return True
+    return (
+        previous["pid"] != current["pid"]
+        or previous["status"] != current["status"]
+        or abs(current["cpu_percent"] - previous["cpu_percent"]) >= STATUS_CPU_THRESHOLD
+        or abs(current["memory_used"] - previous["memory_used"])
+        >= previous["memory_used"] * STATUS_MEMORY_THRESHOLD
+    )
+
+
+@router.websocket("/{uin}/process/status")
+async def process_status_realtime(
+    websocket: WebSocket, process: GoCQProcess = RunningProcess()
+):
+    """Push the full status first, then only the fields that changed."""
+    await websocket.accept()
+
+    async def sender():
+        sent: Dict[str, Any] = {}
+        while True:
+            changed = process.status_changed
+            current = {
+                **process.status_snapshot().dict(),
+                "connected": process.account.uin in BOT_REGISTRY,
+            }
+            delta = {
+                key: value
+                for key, value in current.items()
+                if key != "total_logs"
+                and (
+                    key not in sent
+                    or (
+                        status_details_changed(sent[key], value)
+                        if key == "details"
+                        else sent[key] != value
+                    )
+                )
+            }
+            if delta:
+                delta["total_logs"] = current["total_logs"]
+                await websocket.send_text(json.dumps(delta))
+                sent.update(delta)
+            await changed.wait()
+
+    await serve_websocket(websocket, sender())
+    return
+
+
+@router.get("/{uin}/process/metrics", response_model=List[ProcessMetrics])
+async def process_metrics(process: GoCQProcess = RunningProcess()):
+    return [*process.metrics.history]
+
+
+@router.get("/{uin}/process/profile", response_model=Dict[str, StageHistogram])
+async def process_profile(process: GoCQProcess = RunningProcess()):
+    if process.profiler is None:
+        raise ProfilingDisabled
+    return process.profiler.snapshot()
+
+
+@router.delete("/{uin}/process/profile", status_code=204)
+async def process_profile_reset(process: GoCQProcess = RunningProcess()):
+    if process.profiler is None:
+        raise ProfilingDisabled
+    process.profiler.reset()
+
+
+@router.get(
+    "/{uin}/process/logs",
+    response_class=Response,
+    responses={200: {"model": List[ProcessLog]}},
+)
 async def process_logs_history(
-    reverse: bool = False,
+    cursor: models.LogCursor = Depends(),
+    log_filter: models.LogFilter = Depends(),
+    process: GoCQProcess = RunningProcess(),
+):
+    items = search_logs(process.logs, cursor, log_filter, attrgetter("message"))
+    return encode_logs(items, lambda seq, log: log.frame(seq))
+
+
+@router.get("/{uin}/process/logs/stream", response_class=StreamingResponse)
+async def process_logs_stream(
+    cursor: models.LogCursor = Depends(),
+    log_filter: models.LogFilter = Depends(),
+    process: GoCQProcess = RunningProcess(),
+):
+    items = search_logs(process.logs, cursor, log_filter, attrgetter("message"))
+    return stream_logs(items, lambda seq, log: log.frame(seq))
+
+
+@router.get("/{uin}/process/logs/archive", response_model=List[ProcessLog])
+async def process_logs_archive(
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    limit: int = Query(1000, gt=0, le=10000),
     process: GoCQProcess = RunningProcess(),
 ):
-    return process.logs.list(reverse=reverse)
+    if not process.archive:
+        raise LogArchiveDisabled
+    return await process.archive.query(start_time, end_time, limit)
 
 
 @router.post("/{uin}/process/logs", status_code=204)
@@ -280,23 +615,25 @@ async def process_input_line(
 @router.websocket("/{uin}/process/logs")
 async def process_logs_realtime(
     websocket: WebSocket,
+    since: Optional[int] = None,
     process: GoCQProcess = RunningProcess(),
 ):
     await websocket.accept()
 
-    async def log_listener(log: ProcessLog):
-        await websocket.send_text(log.json())
-
-    process.logs.listeners.add(log_listener)
-    try:
-        while websocket.client_state == WebSocketState.CONNECTED:
-            recv = await websocket.receive()
-            logger.trace(
-                f"{process_logs_realtime.__name__!r} received "
-                f"<e>{escape_tag(repr(recv))}</e>"
+    async def log_sender(seq: int, log: ProcessLogRecord):
+        await websocket.send_text(log.frame(seq))
+
+    async def gap_sender(gap: LogGap):
+        # shaped like a log, so clients show it inline, with the gap attached
+        frame = ProcessLog(level=ProcessLogLevel.WARNING, message=gap_message(gap))
+        await websocket.send_text(
+            json.dumps(
+                {
+                    **json.loads(frame.json()),
+                    "gap": {**gap._asdict(), "missed": gap.missed},
+                }
             )
-    except WebSocketDisconnect:
-        pass
-    finally:
-        process.logs.listeners.remove(log_listener)
+        )
+
+    await serve_log_subscriber(websocket, process.logs, log_sender, since, gap_sender)
     return
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from nonebot.adapters import Bot as BaseBot
+from nonebot.adapters.onebot.v11 import ActionFailed, Bot
+
+from ..log import logger
+from ..plugin_config import config as plugin_config
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+
+class TTLCache(Generic[_K, _V]):
+    """Values considered fresh for ``ttl`` seconds, loaded once at a time."""
+
+    def __init__(self, ttl: float, maxsize: Optional[int] = None):
+        self.ttl, self.maxsize = ttl, maxsize
+        self.entries: Dict[_K, Tuple[float, _V]] = {}
+        self.loading: Dict[_K, "asyncio.Future[_V]"] = {}
+        self.hits = self.misses = self.coalesced = 0
+
+    def get(self, key: _K) -> Optional[_V]:
+        entry = self.entries.get(key)
+        return entry[1] if entry else None
+
+    def expired(self, key: _K) -> bool:
+        entry = self.entries.get(key)
+        return entry is None or time.monotonic() >= entry[0]
+
+    def set(self, key: _K, value: _V):
+        self.entries.pop(key, None)
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        if self.maxsize is None or len(self.entries) <= self.maxsize:
+            return
+        now = time.monotonic()
+        for expired_key in [
+            k for k, (expire, _) in self.entries.items() if now >= expire
+        ]:
+            del self.entries[expired_key]
+        while len(self.entries) > self.maxsize:
+            del self.entries[next(iter(self.entries))]
+
+    def pop(self, key: _K):
+        self.entries.pop(key, None)
+
+    async def _load(self, key: _K, loader: Callable[[], Awaitable[_V]]) -> _V:
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        finally:
+            del self.loading[key]
+
+    async def load(self, key: _K, loader: Callable[[], Awaitable[_V]]) -> _V:
+        if (loading := self.loading.get(key)) is None:
+            loading = self.loading[key] = asyncio.ensure_future(self._load(key, loader))
+        return await asyncio.shield(loading)
+
+    async def fetch(self, key: _K, loader: Callable[[], Awaitable[_V]]) -> _V:
+        """Get a fresh value, waiting for it to be loaded if needed."""
+        if not self.expired(key):
+            self.hits += 1
+            return self.entries[key][1]
+        if key in self.loading:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self.load(key, loader)
+
+    def refresh(self, key: _K, loader: Callable[[], Awaitable[_V]]):
+        """Reload an expired value in the background."""
+        if not self.expired(key) or key in self.loading:
+            return
+
+        def done(future: "asyncio.Future[_V]"):
+            if not future.cancelled() and (exception := future.exception()):
+                logger.opt(exception=exception).debug(
+                    f"Failed to refresh cached value of <e>{key}</e>:"
+                )
+
+        asyncio.ensure_future(self.load(key, loader)).add_done_callback(done)
+
+
+class BotRegistry:
+    """Connected OneBot V11 bots indexed by account uin."""
+
+    def __init__(self):
+        self.bots: Dict[int, Bot] = {}
+
+    def get(self, uin: int) -> Optional[Bot]:
+        return self.bots.get(uin)
+
+    def __contains__(self, uin: int) -> bool:
+        return uin in self.bots
+
+    def add(self, bot: BaseBot):
+        if isinstance(bot, Bot) and bot.self_id.isdigit():
+            self.bots[int(bot.self_id)] = bot
+
+    def remove(self, bot: BaseBot):
+        if bot.self_id.isdigit() and self.bots.get(int(bot.self_id)) is bot:
+            del self.bots[int(bot.self_id)]
+
+
+async def call_api(bot: Bot, name: str, params: Dict[str, Any]) -> Any:
+    """Call an API of the bot, returning the response even if it failed."""
+    try:
+        if name not in API_CACHED_ACTIONS:
+            return await bot.call_api(name, **params)
+        key = (bot.self_id, name, json.dumps(params, sort_keys=True))
+        return await API_CACHE.fetch(key, lambda: bot.call_api(name, **params))
+    except ActionFailed as e:
+        return e.info
+
+
+BOT_REGISTRY = BotRegistry()
+LOGIN_INFO_CACHE: TTLCache[int, Dict[str, Any]] = TTLCache(ttl=300)
+
+API_CACHED_ACTIONS = (
+    frozenset(plugin_config.API_CACHE_ACTIONS)
+    if plugin_config.API_CACHE_TTL > 0
+    else frozenset()
+)
+API_CACHE: TTLCache[Tuple[str, str, str], Any] = TTLCache(
+    ttl=plugin_config.API_CACHE_TTL, maxsize=plugin_config.API_CACHE_SIZE
+)
+
+
+def refresh_login_info(uin: int):
+    if bot := BOT_REGISTRY.get(uin):
+        LOGIN_INFO_CACHE.refresh(uin, bot.get_login_info)
@@ -0,0 +1,173 @@
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..log import LOG_STORAGE
+from ..process import ProcessesManager
+from ..process.download import DownloadStats
+from .bots import API_CACHE
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[Dict[str, str], Optional[float]]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+class MetricsWriter:
+    """Render metric families in the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = "gocq_"):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help: str, samples: Iterable[Sample]):
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        name = self.prefix + name
+        self.lines += (f"# HELP {name} {help}", f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(
+                f'{key}="{_escape_label(label)}"' for key, label in labels.items()
+            )
+            self.lines.append(
+                f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+            )
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics() -> str:
+    """Render metrics of all processes from their in-memory counters."""
+    writer, now = MetricsWriter(), time.time()
+    processes = [
+        ({"account": str(process.account.uin)}, process)
+        for process in ProcessesManager.all()
+    ]
+    storages = [(labels, process.logs) for labels, process in processes]
+    storages.append(({"account": "system"}, LOG_STORAGE))
+
+    running = []
+    for labels, process in processes:
+        pid, metrics = process.pid, process.metrics.latest
+        running.append(
+            (labels, pid, metrics if metrics and metrics.pid == pid else None)
+        )
+
+    writer.family(
+        "process_up",
+        "gauge",
+        "Whether the go-cqhttp process is running.",
+        ((labels, int(pid is not None)) for labels, pid, _ in running),
+    )
+    writer.family(
+        "process_restarts_total",
+        "counter",
+        "Restarts of the go-cqhttp process.",
+        ((labels, process.restart_count) for labels, process in processes),
+    )
+    writer.family(
+        "process_last_exit_code",
+        "gauge",
+        "Exit code of the last go-cqhttp process run.",
+        ((labels, process.exit_code) for labels, process in processes),
+    )
+    writer.family(
+        "process_uptime_seconds",
+        "gauge",
+        "Seconds since the running go-cqhttp process started.",
+        (
+            (labels, now - metrics.start_time)
+            for labels, _, metrics in running
+            if metrics
+        ),
+    )
+    writer.family(
+        "process_cpu_percent",
+        "gauge",
+        "CPU usage of the go-cqhttp process at its latest sample.",
+        ((labels, metrics.cpu_percent) for labels, _, metrics in running if metrics),
+    )
+    writer.family(
+        "process_resident_memory_bytes",
+        "gauge",
+        "Resident memory of the go-cqhttp process at its latest sample.",
+        ((labels, metrics.memory_used) for labels, _, metrics in running if metrics),
+    )
+
+    writer.family(
+        "log_lines_total",
+        "counter",
+        "Log lines received, by level.",
+        (
+            ({**labels, "level": level}, count)
+            for labels, storage in storages
+            for level, count in storage.level_counts.items()
+        ),
+    )
+    writer.family(
+        "log_buffer_size",
+        "gauge",
+        "Log lines currently held in memory.",
+        ((labels, len(storage)) for labels, storage in storages),
+    )
+    writer.family(
+        "log_subscribers",
+        "gauge",
+        "Connected log websocket subscribers.",
+        ((labels, len(storage.subscribers)) for labels, storage in storages),
+    )
+    writer.family(
+        "log_dropped_frames_total",
+        "counter",
+        "Log frames dropped because a subscriber fell behind.",
+        ((labels, storage.dropped) for labels, storage in storages),
+    )
+
+    writer.family(
+        "mirror_probe_duration_seconds",
+        "gauge",
+        "Response time of each download mirror at the latest probe.",
+        (
+            ({"domain": domain}, seconds)
+            for domain, seconds in DownloadStats.probe_seconds.items()
+        ),
+    )
+    writer.family(
+        "download_duration_seconds",
+        "gauge",
+        "Duration of the latest successful binary download.",
+        [({}, DownloadStats.download_seconds)],
+    )
+    writer.family(
+        "download_size_bytes",
+        "gauge",
+        "Size of the latest successful binary download.",
+        [({}, DownloadStats.download_bytes or None)],
+    )
+    writer.family(
+        "download_failures_total",
+        "counter",
+        "Failed binary download attempts.",
+        [({}, DownloadStats.failures)],
+    )
+    writer.family(
+        "api_cache_requests_total",
+        "counter",
+        "OneBot API calls of cached actions, by whether they hit the cache.",
+        [
+            ({"result": "hit"}, API_CACHE.hits),
+            ({"result": "miss"}, API_CACHE.misses),
+            ({"result": "coalesced"}, API_CACHE.coalesced),
+        ],
+    )
+    writer.family(
+        "api_cache_size",
+        "gauge",
+        "OneBot API results currently cached.",
+        [({}, len(API_CACHE.entries))],
+    )
+    return writer.render()
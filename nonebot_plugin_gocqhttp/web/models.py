@@ -1,6 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ..plugin_config import AccountProtocol
 from ..process import RunningProcessDetail
@@ -18,6 +19,23 @@ class AccountListItem(BaseModel):
 class AccountCreation(BaseModel):
     password: Optional[str] = None
     protocol: AccountProtocol = AccountProtocol.iPad
+    priority: int = 0
+
+
+class ApiAction(BaseModel):
+    name: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ApiBroadcast(ApiAction):
+    accounts: Optional[List[int]] = None
+
+
+class CacheStats(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    coalesced: int
 
 
 class AccountConfigFile(BaseModel):
@@ -46,8 +64,24 @@ class SystemDiskDetail(BaseModel):
 
 
 class SystemStatus(BaseModel):
+    time: float
     cpu_percent: float
     memory: SystemMemoryDetail
     disk: SystemDiskDetail
     boot_time: float
     process: RunningProcessDetail
+
+
+class LogCursor(BaseModel):
+    after_seq: Optional[int] = None
+    before_seq: Optional[int] = None
+    limit: Optional[int] = Field(None, gt=0)
+    reverse: bool = False
+
+
+class LogFilter(BaseModel):
+    level: Optional[str] = None
+    keyword: Optional[str] = None
+    regex: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
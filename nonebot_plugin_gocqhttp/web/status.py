@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Optional, Set
+
+import psutil
+
+from ..log import logger
+from . import models
+
+
+class SystemStatusCollector:
+    """Sample status of the system and the bot process at a fixed interval."""
+
+    def __init__(self, *, interval: float = 2, history_size: int = 90):
+        self.interval = interval
+        self.history: Deque[models.SystemStatus] = deque(maxlen=history_size)
+        self.process = psutil.Process()
+        self.waiters: Set["asyncio.Future[models.SystemStatus]"] = set()
+        self.task: Optional["asyncio.Task[None]"] = None
+
+        # set the baselines of the first readings
+        psutil.cpu_percent()
+        self.process.cpu_percent()
+
+    @property
+    def latest(self) -> Optional[models.SystemStatus]:
+        return self.history[-1] if self.history else None
+
+    def sample(self) -> models.SystemStatus:
+        virtual_memory = psutil.virtual_memory()._asdict()
+        disk_usage = psutil.disk_usage(path=os.getcwd())._asdict()
+        with self.process.oneshot():
+            return models.SystemStatus(
+                time=time.time(),
+                cpu_percent=psutil.cpu_percent(),
+                memory=models.SystemMemoryDetail(**virtual_memory),
+                disk=models.SystemDiskDetail(**disk_usage),
+                boot_time=psutil.boot_time(),
+                process=models.RunningProcessDetail(
+                    pid=self.process.pid,
+                    cpu_percent=self.process.cpu_percent(),
+                    status=self.process.status(),
+                    memory_used=self.process.memory_info().rss,
+                    start_time=self.process.create_time(),
+                ),
+            )
+
+    async def _run(self):
+        while True:
+            try:
+                status = self.sample()
+            except Exception:
+                logger.exception("Failed to collect system status:")
+            else:
+                self.history.append(status)
+                waiters, self.waiters = self.waiters, set()
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(status)
+            await asyncio.sleep(self.interval)
+
+    async def wait(self) -> models.SystemStatus:
+        """Wait for the next snapshot, starting the collector if needed."""
+        self.start()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.add(waiter)
+        try:
+            return await waiter
+        finally:
+            self.waiters.discard(waiter)
+
+    async def current(self) -> models.SystemStatus:
+        self.start()
+        return self.latest or await self.wait()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+STATUS_COLLECTOR = SystemStatusCollector()